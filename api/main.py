@@ -7,15 +7,21 @@ from typing import AsyncGenerator
 
 import structlog
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from prometheus_client import make_asgi_app
+from starlette.middleware import Middleware
 from sentry_sdk.integrations.fastapi import FastApiIntegration
+from sqlalchemy import text
 
+from api.dependencies import engine
 from api.middleware.auth import AuthMiddleware
 from api.middleware.rate_limit import RateLimitMiddleware
 from api.routers import analyze, feedback, health
 from core.config import get_settings
+from core.llm.cache import shutdown_pool
+from core.llm.client import shutdown_http_client
 from observability.logging import setup_logging
 from observability.metrics import setup_metrics
 from observability.tracing import setup_tracing
@@ -34,15 +40,44 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     logger.info("Starting Code Review AI API")
     setup_metrics()
     setup_tracing()
-    
+
+    # Warm connections so the first requests don't pay connection setup
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        await analyze.redis_client.ping()
+    except Exception as e:
+        logger.warning("Connection warmup failed", error=str(e))
+
     yield
-    
+
     # Shutdown
     logger.info("Shutting down Code Review AI API")
+    await shutdown_http_client()
+    await shutdown_pool()
+    await engine.dispose()
 
 
 def create_app() -> FastAPI:
     """Create and configure FastAPI application"""
+    # Declared outermost-first: auth must run before rate limiting so the
+    # limiter can key on the verified token payload rather than the IP
+    middleware = [
+        Middleware(
+            TrustedHostMiddleware,
+            allowed_hosts=["localhost", "127.0.0.1", "*.yourdomain.com"]
+        ),
+        Middleware(
+            CORSMiddleware,
+            allow_origins=settings.CORS_ORIGINS,
+            allow_credentials=True,
+            allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE"],
+            allow_headers=["*"],
+        ),
+        Middleware(AuthMiddleware),
+        Middleware(RateLimitMiddleware),
+    ]
+
     app = FastAPI(
         title="Code Review AI",
         description="Intelligent Code Review Assistant with Contextual Learning",
@@ -50,27 +85,10 @@ def create_app() -> FastAPI:
         docs_url="/docs" if settings.DEBUG else None,
         redoc_url="/redoc" if settings.DEBUG else None,
         lifespan=lifespan,
+        default_response_class=ORJSONResponse,
+        middleware=middleware,
     )
 
-    # Security middleware
-    app.add_middleware(
-        TrustedHostMiddleware,
-        allowed_hosts=["localhost", "127.0.0.1", "*.yourdomain.com"]
-    )
-
-    # CORS middleware
-    app.add_middleware(
-        CORSMiddleware,
-        allow_origins=settings.CORS_ORIGINS,
-        allow_credentials=True,
-        allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE"],
-        allow_headers=["*"],
-    )
-
-    # Custom middleware
-    app.add_middleware(AuthMiddleware)
-    app.add_middleware(RateLimitMiddleware)
-
     # Include routers
     app.include_router(health.router, prefix="/health", tags=["health"])
     app.include_router(analyze.router, prefix="/api/v1/analyze", tags=["analyze"])
@@ -97,12 +115,19 @@ async def root():
 
 
 if __name__ == "__main__":
+    import os
+
     import uvicorn
-    
+
     uvicorn.run(
         "api.main:app",
         host=settings.API_HOST,
         port=settings.API_PORT,
         reload=settings.DEBUG,
         log_level=settings.LOG_LEVEL.lower(),
+        # uvloop + httptools: C event loop and HTTP parser from
+        # uvicorn[standard]; reload mode requires a single worker
+        loop="uvloop",
+        http="httptools",
+        workers=1 if settings.DEBUG else (os.cpu_count() or 1),
     )
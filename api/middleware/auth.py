@@ -1,16 +1,18 @@
 """
 Authentication middleware for Code Review AI
 """
+import hashlib
 import time
 from typing import Optional
 
+import jwt
 import structlog
-from fastapi import Request, HTTPException, Depends
+from fastapi import HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import JWTError, jwt
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from api.dependencies import get_db
 from core.config import get_settings
 from db.models import User
 
@@ -18,25 +20,40 @@ logger = structlog.get_logger(__name__)
 security = HTTPBearer()
 settings = get_settings()
 
+# Key material and algorithm list are constant for the process lifetime;
+# resolve them once instead of re-deriving on every request.
+_JWT_KEY = settings.JWT_SECRET_KEY.encode()
+_JWT_ALGORITHMS = [settings.JWT_ALGORITHM]
+
+# Path prefixes exempt from authentication (health probes, docs, metrics).
+# A tuple so the check is a single C-level str.startswith call.
+_SKIP_PREFIXES = ("/health", "/docs", "/redoc", "/openapi.json", "/metrics")
+
 
 class AuthMiddleware:
     """Authentication middleware for FastAPI"""
-    
+
+    # Cap on cached payloads; evicted opportunistically once exceeded
+    _CACHE_MAX_ENTRIES = 10_000
+
     def __init__(self, app):
         self.app = app
+        self._key = _JWT_KEY
+        self._algorithms = _JWT_ALGORITHMS
+        # Verified-payload cache: token digest -> (expiry, payload). Repeat
+        # requests with the same bearer token skip signature verification.
+        # Safe without a lock: each worker runs a single event loop thread.
+        self._payload_cache: dict[bytes, tuple[float, dict]] = {}
+        # Pre-bound logger so hot-path log calls skip per-call binding
+        self._log = logger.bind(component="auth")
 
     async def __call__(self, scope, receive, send):
-        if scope["type"] == "http":
-            request = Request(scope, receive)
-            
-            # Skip auth for health checks and docs
-            if request.url.path in ["/health", "/docs", "/redoc", "/openapi.json", "/metrics"]:
-                await self.app(scope, receive, send)
-                return
-            
+        # Work on the raw ASGI scope: building a Request object parses every
+        # header just to answer a path/header lookup we can do directly.
+        if scope["type"] == "http" and not scope["path"].startswith(_SKIP_PREFIXES):
             # Extract and validate token
             try:
-                token = self._extract_token(request)
+                token = self._extract_token(scope)
                 if token:
                     payload = self._verify_token(token)
                     if payload:
@@ -46,41 +63,71 @@ class AuthMiddleware:
                 # Let individual endpoints handle auth requirements
                 pass
             except Exception as e:
-                logger.warning("Auth middleware error", error=str(e))
+                self._log.warning("Auth middleware error", error=str(e))
 
         await self.app(scope, receive, send)
 
-    def _extract_token(self, request: Request) -> Optional[str]:
-        """Extract JWT token from request"""
-        authorization = request.headers.get("Authorization")
-        if not authorization:
-            return None
-        
-        if not authorization.startswith("Bearer "):
-            return None
-            
-        return authorization.split(" ")[1]
-
-    def _verify_token(self, token: str) -> Optional[dict]:
-        """Verify JWT token"""
+    def _extract_token(self, scope) -> Optional[bytes]:
+        """Extract JWT token from the raw ASGI headers"""
+        # Stay in bytes: slicing the header value avoids a decode here and
+        # an encode when hashing, and PyJWT accepts bytes tokens directly
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                if value.startswith(b"Bearer "):
+                    return value[7:]
+                return None
+        return None
+
+    def _verify_token(self, token: bytes) -> Optional[dict]:
+        """Verify JWT token, reusing recently verified payloads"""
+        cache_key = hashlib.blake2b(token, digest_size=16).digest()
+        cached = self._payload_cache.get(cache_key)
+        if cached is not None:
+            expiry, payload = cached
+            if expiry > time.time():
+                return payload
+            del self._payload_cache[cache_key]
+
         try:
             payload = jwt.decode(
                 token,
-                settings.JWT_SECRET_KEY,
-                algorithms=[settings.JWT_ALGORITHM]
+                self._key,
+                algorithms=self._algorithms,
+                options={"require": ["exp"]},
             )
-            
-            # Check token expiration
-            exp = payload.get("exp")
-            if exp and exp < time.time():
-                raise HTTPException(status_code=401, detail="Token expired")
-                
+            self._cache_payload(cache_key, payload)
             return payload
-            
-        except JWTError as e:
-            logger.warning("Token verification failed", error=str(e))
+
+        except jwt.ExpiredSignatureError:
+            raise HTTPException(status_code=401, detail="Token expired")
+        except jwt.InvalidTokenError as e:
+            self._log.warning("Token verification failed", error=str(e))
             raise HTTPException(status_code=401, detail="Invalid token")
 
+    def _cache_payload(self, cache_key: bytes, payload: dict) -> None:
+        """Cache a verified payload until shortly before its token expires"""
+        now = time.time()
+        expiry = min(float(payload["exp"]), now + 60)
+        if len(self._payload_cache) > self._CACHE_MAX_ENTRIES:
+            # Opportunistic eviction: drop whatever has already expired
+            expired = [k for k, (exp, _) in self._payload_cache.items() if exp <= now]
+            for k in expired:
+                del self._payload_cache[k]
+        self._payload_cache[cache_key] = (expiry, payload)
+
+
+# Short-lived user_id -> User cache so repeat requests from the same user
+# skip the DB lookup; the JWT already establishes identity. Instances are
+# detached, which is fine for the read-only use endpoints make of them.
+_USER_CACHE: dict[str, tuple[float, User]] = {}
+_USER_CACHE_TTL = 60
+_USER_CACHE_MAX_ENTRIES = 10_000
+
+
+def invalidate_user_cache(user_id: str) -> None:
+    """Drop a cached user after a mutating operation"""
+    _USER_CACHE.pop(user_id, None)
+
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
@@ -90,26 +137,43 @@ async def get_current_user(
     try:
         payload = jwt.decode(
             credentials.credentials,
-            settings.JWT_SECRET_KEY,
-            algorithms=[settings.JWT_ALGORITHM]
+            _JWT_KEY,
+            algorithms=_JWT_ALGORITHMS,
+            options={"require": ["exp"]},
         )
-        
+
         user_id = payload.get("sub")
         if not user_id:
             raise HTTPException(status_code=401, detail="Invalid token")
-        
+
+        now = time.time()
+        cached = _USER_CACHE.get(user_id)
+        if cached is not None:
+            expiry, user = cached
+            if expiry > now:
+                return user
+            del _USER_CACHE[user_id]
+
         # Get user from database
         result = await db.execute(select(User).where(User.id == user_id))
         user = result.scalar_one_or_none()
-        
+
         if not user:
             raise HTTPException(status_code=401, detail="User not found")
-        
+
+        if len(_USER_CACHE) > _USER_CACHE_MAX_ENTRIES:
+            expired = [k for k, (exp, _) in _USER_CACHE.items() if exp <= now]
+            for k in expired:
+                del _USER_CACHE[k]
+        _USER_CACHE[user_id] = (now + _USER_CACHE_TTL, user)
+
         return user
-        
-    except JWTError as e:
+
+    except jwt.InvalidTokenError as e:
         logger.warning("Token verification failed", error=str(e))
         raise HTTPException(status_code=401, detail="Invalid token")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error("User authentication failed", error=str(e))
         raise HTTPException(status_code=500, detail="Authentication failed")
@@ -122,7 +186,7 @@ async def get_optional_user(
     """Get current user if authenticated, None otherwise"""
     if not credentials:
         return None
-    
+
     try:
         return await get_current_user(credentials, db)
     except HTTPException:
@@ -1,11 +1,8 @@
 """
 Rate limiting middleware for Code Review AI
 """
-import time
-from typing import Dict, Tuple
-
 import structlog
-from fastapi import Request, HTTPException
+import redis.asyncio as redis
 from fastapi.responses import JSONResponse
 
 from core.config import get_settings
@@ -13,95 +10,103 @@ from core.config import get_settings
 logger = structlog.get_logger(__name__)
 settings = get_settings()
 
+# Path prefixes exempt from rate limiting (health probes and metrics
+# scrapes). A tuple so the check is a single C-level str.startswith call.
+_SKIP_PREFIXES = ("/health", "/metrics")
+
 
 class RateLimitMiddleware:
-    """Token bucket rate limiting middleware"""
-    
+    """Token bucket rate limiting middleware backed by Redis"""
+
+    # One token is SCALE units so the whole bucket runs on integers:
+    # time in microseconds, tokens pre-scaled, refill via integer
+    # multiply/floor-divide. Exact under Lua doubles (well below 2^53),
+    # so repeated refills can't drift the way fractional floats do.
+    _TOKEN_BUCKET_SCRIPT = """
+    local SCALE = 1000000
+    local now = redis.call('TIME')
+    local t_us = now[1] * 1000000 + now[2]
+    local rpm = tonumber(ARGV[1])
+    local burst_scaled = tonumber(ARGV[2])
+    local bucket = redis.call('HMGET', KEYS[1], 't', 'n')
+    local last_us = tonumber(bucket[1]) or t_us
+    local tokens = tonumber(bucket[2]) or burst_scaled
+    -- elapsed_us * rpm / 60 == refill in scaled tokens (SCALE per token)
+    tokens = math.min(tokens + math.floor((t_us - last_us) * rpm / 60), burst_scaled)
+    local allowed = 0
+    if tokens >= SCALE then
+        tokens = tokens - SCALE
+        allowed = 1
+    end
+    redis.call('HMSET', KEYS[1], 't', t_us, 'n', tokens)
+    redis.call('EXPIRE', KEYS[1], 60)
+    return allowed
+    """
+
     def __init__(self, app):
         self.app = app
-        self.buckets: Dict[str, Tuple[float, int]] = {}  # {key: (last_refill, tokens)}
+        self.redis_client = redis.Redis.from_url(settings.REDIS_URL)
         self.requests_per_minute = settings.RATE_LIMIT_REQUESTS_PER_MINUTE
         self.burst_capacity = settings.RATE_LIMIT_BURST
+        self._burst_scaled = self.burst_capacity * 1_000_000
+        # Script wrapper evalsha's by SHA and transparently re-loads the
+        # script on NOSCRIPT, so a Redis restart or SCRIPT FLUSH can't
+        # push every check into the fail-open branch for the rest of the
+        # process lifetime
+        self._bucket_script = self.redis_client.register_script(
+            self._TOKEN_BUCKET_SCRIPT
+        )
+        # Pre-bound logger so hot-path log calls skip per-call binding
+        self._log = logger.bind(component="rate_limit")
+        # Limits are fixed for the process lifetime, so the rejection body
+        # never changes; build it once instead of per rejected request
+        self._limit_response_content = {
+            "error": "Rate limit exceeded",
+            "message": f"Maximum {self.requests_per_minute} requests per minute",
+            "retry_after": 60,
+        }
 
     async def __call__(self, scope, receive, send):
-        if scope["type"] == "http":
-            request = Request(scope, receive)
-            
-            # Skip rate limiting for health checks
-            if request.url.path in ["/health", "/metrics"]:
-                await self.app(scope, receive, send)
-                return
-            
-            # Get client identifier
-            client_id = self._get_client_id(request)
-            
-            # Check rate limit
-            if not self._check_rate_limit(client_id):
+        # Work on the raw ASGI scope: building a Request object parses every
+        # header just to answer a path/header lookup we can do directly.
+        if scope["type"] == "http" and not scope["path"].startswith(_SKIP_PREFIXES):
+            client_id = self._get_client_id(scope)
+
+            if not await self._check_rate_limit(client_id):
                 response = JSONResponse(
                     status_code=429,
-                    content={
-                        "error": "Rate limit exceeded",
-                        "message": f"Maximum {self.requests_per_minute} requests per minute",
-                        "retry_after": 60
-                    }
+                    content=self._limit_response_content,
                 )
                 await response(scope, receive, send)
                 return
-        
+
         await self.app(scope, receive, send)
 
-    def _get_client_id(self, request: Request) -> str:
+    def _get_client_id(self, scope) -> str:
         """Get client identifier for rate limiting"""
-        # Try to get user ID from request state (set by auth middleware)
-        if hasattr(request.state, "user") and request.state.user:
-            return f"user:{request.state.user.id}"
-        
+        # Try the verified token payload (set by auth middleware)
+        user = scope.get("user")
+        if user and user.get("sub"):
+            return f"user:{user['sub']}"
+
         # Fallback to IP address
-        forwarded_for = request.headers.get("X-Forwarded-For")
-        if forwarded_for:
-            return f"ip:{forwarded_for.split(',')[0].strip()}"
-        
-        client_ip = request.client.host if request.client else "unknown"
-        return f"ip:{client_ip}"
+        for name, value in scope["headers"]:
+            if name == b"x-forwarded-for":
+                return f"ip:{value.split(b',')[0].strip().decode('latin-1')}"
 
-    def _check_rate_limit(self, client_id: str) -> bool:
-        """Check if request is within rate limit using token bucket algorithm"""
-        current_time = time.time()
-        
-        if client_id not in self.buckets:
-            # Initialize bucket
-            self.buckets[client_id] = (current_time, self.burst_capacity)
-            return True
-        
-        last_refill, tokens = self.buckets[client_id]
-        
-        # Calculate time elapsed and refill tokens
-        time_elapsed = current_time - last_refill
-        tokens_to_add = time_elapsed * (self.requests_per_minute / 60.0)
-        new_tokens = min(tokens + tokens_to_add, self.burst_capacity)
-        
-        # Check if we have tokens available
-        if new_tokens >= 1:
-            # Consume one token
-            self.buckets[client_id] = (current_time, new_tokens - 1)
-            return True
-        
-        # Update bucket state
-        self.buckets[client_id] = (current_time, new_tokens)
-        return False
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+    async def _check_rate_limit(self, client_id: str) -> bool:
+        """Check if request is within rate limit using a Redis token bucket"""
+        try:
+            allowed = await self._bucket_script(
+                keys=[f"ratelimit:{client_id}"],
+                args=[self.requests_per_minute, self._burst_scaled],
+            )
+            return bool(allowed)
 
-    def _cleanup_old_buckets(self):
-        """Clean up old rate limit buckets to prevent memory leaks"""
-        current_time = time.time()
-        cleanup_threshold = 300  # 5 minutes
-        
-        to_remove = []
-        for client_id, (last_refill, _) in self.buckets.items():
-            if current_time - last_refill > cleanup_threshold:
-                to_remove.append(client_id)
-        
-        for client_id in to_remove:
-            del self.buckets[client_id]
-        
-        if to_remove:
-            logger.info("Cleaned up old rate limit buckets", count=len(to_remove))
+        except Exception as e:
+            # Fail open: a Redis outage should not take down the API
+            self._log.warning("Rate limit check failed", client_id=client_id, error=str(e))
+            return True
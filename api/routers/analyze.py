@@ -2,14 +2,19 @@
 Code analysis endpoints
 """
 import asyncio
+import json
 from typing import Dict, Any, List
-from uuid import UUID
+from uuid import UUID, uuid4
 
 import structlog
+import redis.asyncio as redis
 from fastapi import APIRouter, HTTPException, Depends, WebSocket, WebSocketDisconnect
 from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.dependencies import get_current_user, get_db
+from api.dependencies import AsyncSessionLocal, get_db
+from api.middleware.auth import get_current_user
+from core.config import get_settings
 from core.llm.client import LLMClient
 from core.rag.retriever import ContextRetriever
 from core.patterns.rules import PatternMatcher
@@ -18,6 +23,14 @@ from db.models import User, CodeReview
 
 logger = structlog.get_logger(__name__)
 router = APIRouter()
+settings = get_settings()
+
+# Shared client for review update pub/sub subscriptions
+redis_client = redis.Redis.from_url(settings.REDIS_URL)
+
+# While streaming, re-check the DB this often when no pub/sub update
+# arrives, so a missed publish can never hang the client
+_STREAM_POLL_SECONDS = 5.0
 
 
 class AnalysisRequest(BaseModel):
@@ -58,8 +71,24 @@ async def analyze_code(
             pr_id=request.pull_request_id
         )
 
-        # Create review record
+        # Pre-generate the review ID so the task can be queued before the
+        # row exists, collapsing the insert into a single commit
+        review_id = uuid4()
+
+        # Queue analysis task; the broker publish is sync I/O, so push it
+        # off the event loop
+        task = await asyncio.to_thread(
+            analyze_code_task.delay,
+            review_id=str(review_id),
+            diff_content=request.diff_content,
+            file_paths=request.file_paths,
+            context_files=request.context_files,
+            repository_url=request.repository_url
+        )
+
+        # Create review record with the task ID already set
         review = CodeReview(
+            id=review_id,
             user_id=current_user.id,
             repository_url=request.repository_url,
             pull_request_id=request.pull_request_id,
@@ -67,26 +96,13 @@ async def analyze_code(
             diff_content=request.diff_content,
             base_commit=request.base_commit,
             head_commit=request.head_commit,
+            task_id=task.id,
         )
         db.add(review)
         await db.commit()
-        await db.refresh(review)
-
-        # Queue analysis task
-        task = analyze_code_task.delay(
-            review_id=str(review.id),
-            diff_content=request.diff_content,
-            file_paths=request.file_paths,
-            context_files=request.context_files,
-            repository_url=request.repository_url
-        )
-
-        # Update review with task ID
-        review.task_id = task.id
-        await db.commit()
 
         return AnalysisResponse(
-            review_id=review.id,
+            review_id=review_id,
             status="processing",
             suggestions=[],
             confidence_scores=[],
@@ -125,6 +141,18 @@ async def get_analysis_result(
     )
 
 
+def _completion_payload(review: CodeReview) -> Dict[str, Any]:
+    """Terminal websocket frame for a finished review"""
+    return {
+        "type": "complete",
+        "status": review.status,
+        "suggestions": review.suggestions or [],
+        "confidence_scores": review.confidence_scores or [],
+        "processing_time": review.processing_time or 0.0,
+        "cost_estimate": review.cost_estimate or 0.0
+    }
+
+
 @router.websocket("/{review_id}/stream")
 async def stream_analysis(
     websocket: WebSocket,
@@ -135,36 +163,51 @@ async def stream_analysis(
     Stream analysis results in real-time
     """
     await websocket.accept()
-    
+
     try:
-        # Get review from database
-        db = next(get_db())
-        review = await db.get(CodeReview, review_id)
-        if not review or review.user_id != current_user.id:
-            await websocket.close(code=403, reason="Access denied")
-            return
-
-        # Stream analysis progress
-        while review.status == "processing":
-            await websocket.send_json({
-                "type": "progress",
-                "status": review.status,
-                "message": "Analyzing code changes..."
-            })
-            
-            # Check for updates
-            await db.refresh(review)
-            await asyncio.sleep(1)
-
-        # Send final results
-        await websocket.send_json({
-            "type": "complete",
-            "status": review.status,
-            "suggestions": review.suggestions or [],
-            "confidence_scores": review.confidence_scores or [],
-            "processing_time": review.processing_time or 0.0,
-            "cost_estimate": review.cost_estimate or 0.0
-        })
+        # Subscribe before reading the status: a completion the worker
+        # publishes between the DB check and the subscription would be
+        # lost (fast tasks can finish before the client even connects),
+        # leaving the socket waiting on a message that never comes
+        pubsub = redis_client.pubsub()
+        await pubsub.subscribe(f"review:{review_id}")
+        try:
+            async with AsyncSessionLocal() as db:
+                review = await db.get(CodeReview, review_id)
+                if not review or review.user_id != current_user.id:
+                    await websocket.close(code=403, reason="Access denied")
+                    return
+
+                if review.status != "processing":
+                    # Already finished; nothing to stream
+                    await websocket.send_json(_completion_payload(review))
+                    return
+
+            # Follow worker updates over pub/sub, falling back to a
+            # periodic DB re-check whenever no update arrives in the
+            # window so a missed publish can't hang the client forever
+            while True:
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True,
+                    timeout=_STREAM_POLL_SECONDS
+                )
+                if message is None:
+                    async with AsyncSessionLocal() as db:
+                        review = await db.get(CodeReview, review_id)
+                    if review is not None and review.status != "processing":
+                        await websocket.send_json(_completion_payload(review))
+                        break
+                    continue
+
+                update = json.loads(message["data"])
+                if update.get("status") == "processing":
+                    await websocket.send_json({"type": "progress", **update})
+                else:
+                    await websocket.send_json({"type": "complete", **update})
+                    break
+        finally:
+            await pubsub.unsubscribe(f"review:{review_id}")
+            await pubsub.close()
 
     except WebSocketDisconnect:
         logger.info("WebSocket disconnected", review_id=review_id)
@@ -192,8 +235,9 @@ async def regenerate_analysis(
     review.confidence_scores = None
     await db.commit()
 
-    # Queue new analysis
-    task = analyze_code_task.delay(
+    # Queue new analysis off the event loop
+    task = await asyncio.to_thread(
+        analyze_code_task.delay,
         review_id=str(review.id),
         diff_content=review.diff_content,
         file_paths=[],
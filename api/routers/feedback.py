@@ -1,14 +1,18 @@
 """
 Feedback endpoints for learning system
 """
-from typing import Dict, Any, List
+from datetime import datetime
+from typing import Dict, Any, List, Optional
 from uuid import UUID
 
 import structlog
 from fastapi import APIRouter, HTTPException, Depends
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.dependencies import get_current_user, get_db
+from api.dependencies import get_db
+from api.middleware.auth import get_current_user
 from core.feedback.learner import FeedbackLearner
 from db.models import User, CodeReview, Feedback
 
@@ -32,6 +36,21 @@ class FeedbackResponse(BaseModel):
     message: str = Field(..., description="Response message")
 
 
+class FeedbackHistoryItem(BaseModel):
+    """Single feedback entry in the history listing"""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: UUID = Field(..., description="Feedback ID")
+    review_id: UUID = Field(..., description="Review ID")
+    suggestion_id: str = Field(..., description="Suggestion ID")
+    helpful: bool = Field(..., description="Whether suggestion was helpful")
+    # Nullable in the DB; defaults don't apply when from_attributes sees
+    # an explicit None, so the types must admit it
+    correction: Optional[str] = Field(default=None, description="Correction or additional context")
+    category: Optional[str] = Field(default=None, description="Feedback category")
+    created_at: datetime = Field(..., description="Submission timestamp")
+
+
 class LearningMetrics(BaseModel):
     """Learning metrics response"""
     total_feedback: int = Field(..., description="Total feedback count")
@@ -118,40 +137,29 @@ async def get_learning_metrics(
         raise HTTPException(status_code=500, detail="Failed to retrieve metrics")
 
 
-@router.get("/history")
+@router.get("/history", response_model=List[FeedbackHistoryItem])
 async def get_feedback_history(
     limit: int = 50,
     offset: int = 0,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
-) -> List[Dict[str, Any]]:
+) -> List[FeedbackHistoryItem]:
     """
     Get feedback history for the current user
     """
     try:
         # Query feedback history
-        feedback_query = (
-            db.query(Feedback)
-            .filter(Feedback.user_id == current_user.id)
+        stmt = (
+            select(Feedback)
+            .where(Feedback.user_id == current_user.id)
             .order_by(Feedback.created_at.desc())
             .offset(offset)
             .limit(limit)
         )
-        
-        feedback_list = await feedback_query.all()
-        
-        return [
-            {
-                "id": str(feedback.id),
-                "review_id": str(feedback.review_id),
-                "suggestion_id": feedback.suggestion_id,
-                "helpful": feedback.helpful,
-                "correction": feedback.correction,
-                "category": feedback.category,
-                "created_at": feedback.created_at.isoformat()
-            }
-            for feedback in feedback_list
-        ]
+
+        # FastAPI validates ORM rows against the response model via
+        # pydantic-core, so serialization stays on the Rust path
+        return (await db.scalars(stmt)).all()
 
     except Exception as e:
         logger.error("Failed to get feedback history", error=str(e))
@@ -200,23 +208,30 @@ async def submit_batch_feedback(
         if not review or review.user_id != current_user.id:
             raise HTTPException(status_code=404, detail="Review not found")
 
-        # Create feedback records
-        feedback_records = []
-        for feedback_req in feedback_list:
-            feedback = Feedback(
-                user_id=current_user.id,
-                review_id=review.id,
-                suggestion_id=feedback_req.suggestion_id,
-                helpful=feedback_req.helpful,
-                correction=feedback_req.correction,
-                category=feedback_req.category
-            )
-            feedback_records.append(feedback)
-            db.add(feedback)
-
+        # Insert all feedback rows in a single multi-values INSERT instead
+        # of one statement per item
+        values = [
+            {
+                "user_id": current_user.id,
+                "review_id": review.id,
+                "suggestion_id": feedback_req.suggestion_id,
+                "helpful": feedback_req.helpful,
+                "correction": feedback_req.correction,
+                "category": feedback_req.category,
+            }
+            for feedback_req in feedback_list
+        ]
+        result = await db.execute(
+            insert(Feedback).values(values).returning(Feedback.id)
+        )
+        feedback_ids = result.scalars().all()
         await db.commit()
 
         # Trigger batch learning
+        feedback_records = [
+            {"id": feedback_id, **row}
+            for feedback_id, row in zip(feedback_ids, values)
+        ]
         learner = FeedbackLearner()
         await learner.process_batch_feedback(feedback_records)
 
@@ -5,8 +5,7 @@ from datetime import datetime
 from typing import Dict, Any
 
 import structlog
-from fastapi import APIRouter, HTTPException
-from sqlalchemy import text
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from api.dependencies import get_db
@@ -29,13 +28,13 @@ async def health_check() -> Dict[str, Any]:
 
 
 @router.get("/ready")
-async def readiness_check(db: AsyncSession = get_db()) -> Dict[str, Any]:
+async def readiness_check(db: AsyncSession = Depends(get_db)) -> Dict[str, Any]:
     """Readiness check with database connectivity"""
     try:
-        # Test database connection
-        result = await db.execute(text("SELECT 1"))
-        result.fetchone()
-        
+        # Driver-level ping; skips statement compilation entirely
+        conn = await db.connection()
+        await conn.exec_driver_sql("SELECT 1")
+
         return {
             "status": "ready",
             "timestamp": datetime.utcnow().isoformat(),
@@ -3,19 +3,28 @@ Configuration management for Code Review AI
 """
 import os
 from functools import lru_cache
+from pathlib import Path
+from types import SimpleNamespace
 from typing import List
 
-from pydantic import Field
+from pydantic import Field, PrivateAttr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+# Resolved-constants module written by `python -m core.config freeze`
+_FROZEN_MODULE_PATH = Path(__file__).with_name("config_frozen.py")
+
 
 class Settings(BaseSettings):
     """Application settings"""
     
+    # frozen=True: settings are process-lifetime constants, so reject
+    # accidental mutation of the cached instance and let pydantic skip
+    # mutability bookkeeping on it
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
         case_sensitive=False,
+        frozen=True,
     )
 
     # API Configuration
@@ -43,7 +52,19 @@ class Settings(BaseSettings):
         description="Embeddings model"
     )
     LLM_MAX_TOKENS: int = Field(default=4000, description="Max tokens for LLM")
+    LLM_CONCURRENCY: int = Field(
+        default=10,
+        description="Max concurrent LLM provider calls"
+    )
     LLM_TEMPERATURE: float = Field(default=0.1, description="LLM temperature")
+    LLM_MAX_INPUT_TOKENS: int = Field(
+        default=100000,
+        description="Reject prompts estimated above this many input tokens"
+    )
+    MAX_CONTEXT_CHARS: int = Field(
+        default=20000,
+        description="Hard cap on retrieved context included in a prompt"
+    )
 
     # Vector Database
     WEAVIATE_URL: str = Field(..., description="Weaviate URL")
@@ -83,6 +104,22 @@ class Settings(BaseSettings):
         description="Alert threshold in USD"
     )
     CACHE_TTL_DAYS: int = Field(default=90, description="Cache TTL in days")
+    SEMANTIC_CACHE_ENABLED: bool = Field(
+        default=False,
+        description="Serve near-duplicate analyses from the semantic cache"
+    )
+    SEMANTIC_CACHE_THRESHOLD: float = Field(
+        default=0.95,
+        description="Cosine similarity required for a semantic cache hit"
+    )
+    EMBEDDING_SEMANTIC_CACHE_ENABLED: bool = Field(
+        default=False,
+        description="Reuse cached embedding vectors for near-duplicate texts"
+    )
+    EMBEDDING_SEMANTIC_CACHE_THRESHOLD: float = Field(
+        default=0.86,
+        description="Token-vector cosine required to reuse a cached embedding"
+    )
 
     # Security
     JWT_SECRET_KEY: str = Field(..., description="JWT secret key")
@@ -110,18 +147,85 @@ class Settings(BaseSettings):
     ENVIRONMENT: str = Field(default="development", description="Environment")
     DEBUG: bool = Field(default=False, description="Debug mode")
 
+    # Precomputed once at validation so the properties below are plain
+    # attribute reads instead of a .lower() + compare per call
+    _is_production: bool = PrivateAttr(default=False)
+    _is_development: bool = PrivateAttr(default=False)
+
+    def model_post_init(self, __context) -> None:
+        environment = self.ENVIRONMENT.lower()
+        self._is_production = environment == "production"
+        self._is_development = environment == "development"
+
     @property
     def is_production(self) -> bool:
         """Check if running in production"""
-        return self.ENVIRONMENT.lower() == "production"
+        return self._is_production
 
     @property
     def is_development(self) -> bool:
         """Check if running in development"""
-        return self.ENVIRONMENT.lower() == "development"
+        return self._is_development
+
+
+def freeze_settings() -> Path:
+    """Write the resolved settings to core/config_frozen.py
+
+    In production the environment is fixed for the process lifetime, so
+    validating it on every restart is wasted startup time. This snapshots
+    the validated values as plain module constants that get_settings can
+    load without running pydantic at all.
+    """
+    settings = Settings()
+    lines = [
+        '"""',
+        "Generated by `python -m core.config freeze` — do not edit or commit.",
+        '"""',
+    ]
+    for name in Settings.model_fields:
+        lines.append(f"{name} = {getattr(settings, name)!r}")
+    lines.append(f"is_production = {settings.is_production!r}")
+    lines.append(f"is_development = {settings.is_development!r}")
+    _FROZEN_MODULE_PATH.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return _FROZEN_MODULE_PATH
+
+
+def _load_frozen_settings() -> SimpleNamespace | None:
+    """Load the frozen settings snapshot if running in production"""
+    if os.environ.get("ENVIRONMENT", "").lower() != "production":
+        return None
+    try:
+        from core import config_frozen
+    except ImportError:
+        return None
+    return SimpleNamespace(**{
+        name: value
+        for name, value in vars(config_frozen).items()
+        if not name.startswith("_")
+    })
 
 
 @lru_cache()
 def get_settings() -> Settings:
     """Get cached settings instance"""
+    frozen = _load_frozen_settings()
+    if frozen is not None:
+        return frozen
     return Settings()
+
+
+# Module-level singleton plus primitive snapshots of hot-path values.
+# Reading a plain int avoids pydantic's per-access field machinery in
+# code that runs on every request or feedback event.
+SETTINGS = get_settings()
+CACHE_TTL_SECONDS: int = SETTINGS.CACHE_TTL_DAYS * 24 * 3600
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == "freeze":
+        print(f"Wrote {freeze_settings()}")
+    else:
+        print("Usage: python -m core.config freeze", file=sys.stderr)
+        sys.exit(1)
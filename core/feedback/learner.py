@@ -1,17 +1,71 @@
 """
 Feedback learning system for Code Review AI
 """
+import itertools
+import re
 import time
+from collections import deque
 from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
-from dataclasses import dataclass
+from datetime import datetime, timezone
+from dataclasses import asdict, dataclass
 
+import numpy as np
 import structlog
+import redis.asyncio as redis
 from core.config import get_settings
 
 logger = structlog.get_logger(__name__)
 settings = get_settings()
 
+# Shared client for the feedback-weight counters. Keeping these in Redis
+# hashes makes the updates atomic across workers and survives restarts —
+# learner instances are created per request, so in-process counters were
+# lost immediately anyway.
+redis_client = redis.Redis.from_url(settings.REDIS_URL)
+
+# Key layout for feedback-weight counters
+_FW_KEY = "fw:{}"              # per-suggestion hash: total / helpful
+_FW_CATEGORY_KEY = "fw:{}:{}"  # per-suggestion-per-category hash
+_FW_IDS_KEY = "fw_ids"         # set of tracked suggestion ids
+_FW_TOTAL_SUM_KEY = "fw_total_sum"      # running aggregate: all feedback
+_FW_HELPFUL_SUM_KEY = "fw_helpful_sum"  # running aggregate: helpful feedback
+
+# Keyword -> pattern name mapping for correction text, matched in a single
+# case-insensitive scan instead of one substring search per keyword
+_CORRECTION_PATTERN_RE = re.compile(r"null|error|security|performance", re.IGNORECASE)
+_CORRECTION_PATTERN_MAP = {
+    "null": "null_check",
+    "error": "error_handling",
+    "security": "security",
+    "performance": "performance",
+}
+
+# Category-specific learning weight, hoisted out of the per-feedback path
+# so impact scoring is one dict probe instead of a dict build + probe
+_CATEGORY_WEIGHTS = {
+    "security": 0.3,
+    "performance": 0.2,
+    "bug": 0.25,
+    "style": 0.1,
+    "maintainability": 0.15,
+}
+_DEFAULT_CATEGORY_WEIGHT = 0.1
+
+
+@dataclass(slots=True)
+class LearningEvent:
+    """A single processed feedback event
+
+    Slots instead of a per-event dict: no instance __dict__, fixed field
+    offsets, and roughly half the memory per event — this is allocated on
+    every feedback ingested.
+    """
+    timestamp: float
+    feedback_id: Optional[str]
+    helpful: bool
+    category: str
+    learning_impact: float
+
 
 @dataclass
 class LearningMetrics:
@@ -30,9 +84,59 @@ class FeedbackLearner:
     
     def __init__(self):
         self.learning_rate = 0.1
-        self.feedback_weights = {}
+        # Weight updates staged by _apply_feedback_event and flushed to
+        # Redis in one pipeline per (batch) call
+        self._pending_weight_ops = []
         self.pattern_confidence = {}
-        self.learning_history = []
+        # Ring buffer: metrics only ever look at recent events, so cap the
+        # history instead of letting it grow without bound
+        self.learning_history = deque(maxlen=10_000)
+        # Structure-of-arrays mirror of the helpful flags, grown in chunks,
+        # so history-wide metrics are one C-level pass instead of a Python
+        # loop over event dicts
+        self._helpful_arr = np.empty(1024, dtype=bool)
+        self._event_count = 0
+
+    def _record_event_flags(self, helpful: bool) -> None:
+        """Append a feedback outcome to the metrics array, doubling on overflow"""
+        if self._event_count == len(self._helpful_arr):
+            grown = np.empty(len(self._helpful_arr) * 2, dtype=bool)
+            grown[:self._event_count] = self._helpful_arr
+            self._helpful_arr = grown
+        self._helpful_arr[self._event_count] = helpful
+        self._event_count += 1
+
+    def _apply_feedback_event(self, feedback_data: Dict[str, Any]) -> float:
+        """Apply a single feedback event to the learning state
+
+        Updates weights, pattern confidence, and history; returns the
+        learning impact. Metric recalculation is left to the caller so
+        batch ingestion can do it once rather than per event.
+        """
+        helpful = feedback_data.get("helpful", False)
+        suggestion_id = feedback_data.get("suggestion_id", "")
+        category = feedback_data.get("category", "general")
+        correction = feedback_data.get("correction", "")
+
+        # Update learning weights
+        self._update_weights(suggestion_id, helpful, category)
+
+        # Update pattern confidence
+        if correction:
+            self._update_pattern_confidence(correction, helpful)
+
+        # Record learning event
+        learning_impact = self._calculate_learning_impact(helpful, category)
+        self.learning_history.append(LearningEvent(
+            timestamp=time.time(),
+            feedback_id=feedback_data.get("id"),
+            helpful=helpful,
+            category=category,
+            learning_impact=learning_impact
+        ))
+        self._record_event_flags(helpful)
+
+        return learning_impact
 
     async def process_feedback(self, feedback_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -40,46 +144,26 @@ class FeedbackLearner:
         """
         try:
             logger.debug("Processing feedback", feedback_id=feedback_data.get("id"))
-            
-            # Extract feedback information
-            helpful = feedback_data.get("helpful", False)
-            suggestion_id = feedback_data.get("suggestion_id", "")
-            category = feedback_data.get("category", "general")
-            correction = feedback_data.get("correction", "")
-            
-            # Update learning weights
-            self._update_weights(suggestion_id, helpful, category)
-            
-            # Update pattern confidence
-            if correction:
-                self._update_pattern_confidence(correction, helpful)
-            
-            # Record learning event
-            learning_event = {
-                "timestamp": datetime.utcnow(),
-                "feedback_id": feedback_data.get("id"),
-                "helpful": helpful,
-                "category": category,
-                "learning_impact": self._calculate_learning_impact(helpful, category)
-            }
-            self.learning_history.append(learning_event)
-            
+
+            learning_impact = self._apply_feedback_event(feedback_data)
+            await self._flush_weight_updates()
+
             # Calculate learning metrics
-            metrics = self._calculate_metrics()
-            
+            metrics = await self._calculate_metrics()
+
             logger.info(
                 "Feedback processed",
                 feedback_id=feedback_data.get("id"),
-                helpful=helpful,
-                learning_impact=learning_event["learning_impact"]
+                helpful=feedback_data.get("helpful", False),
+                learning_impact=learning_impact
             )
-            
+
             return {
                 "status": "processed",
-                "learning_impact": learning_event["learning_impact"],
+                "learning_impact": learning_impact,
                 "metrics": metrics
             }
-            
+
         except Exception as e:
             logger.error("Feedback processing failed", error=str(e))
             raise
@@ -90,56 +174,70 @@ class FeedbackLearner:
         """
         try:
             logger.info("Processing batch feedback", count=len(feedback_list))
-            
-            batch_results = []
+
+            # Apply the whole batch in one pass and recalculate metrics
+            # once at the end; recalculating per event scans the growing
+            # history and turns a K-item batch into O(K * history) work
             total_impact = 0.0
-            
             for feedback in feedback_list:
-                result = await self.process_feedback(feedback)
-                batch_results.append(result)
-                total_impact += result.get("learning_impact", 0.0)
-            
+                total_impact += self._apply_feedback_event(feedback)
+            await self._flush_weight_updates()
+
             # Calculate batch learning metrics
             batch_metrics = self._calculate_batch_metrics(feedback_list)
-            
+
             logger.info(
                 "Batch feedback processed",
                 count=len(feedback_list),
                 total_impact=total_impact
             )
-            
+
             return {
                 "status": "batch_processed",
                 "processed_count": len(feedback_list),
                 "total_impact": total_impact,
                 "batch_metrics": batch_metrics
             }
-            
+
         except Exception as e:
             logger.error("Batch feedback processing failed", error=str(e))
             raise
 
     def _update_weights(self, suggestion_id: str, helpful: bool, category: str):
-        """Update learning weights based on feedback"""
-        if suggestion_id not in self.feedback_weights:
-            self.feedback_weights[suggestion_id] = {
-                "total_feedback": 0,
-                "helpful_feedback": 0,
-                "categories": {}
-            }
-        
-        weight_data = self.feedback_weights[suggestion_id]
-        weight_data["total_feedback"] += 1
-        
-        if helpful:
-            weight_data["helpful_feedback"] += 1
-        
-        if category not in weight_data["categories"]:
-            weight_data["categories"][category] = {"total": 0, "helpful": 0}
-        
-        weight_data["categories"][category]["total"] += 1
-        if helpful:
-            weight_data["categories"][category]["helpful"] += 1
+        """Stage a feedback-weight update for the next Redis flush"""
+        self._pending_weight_ops.append((suggestion_id, helpful, category))
+
+    async def _flush_weight_updates(self) -> None:
+        """Flush staged weight updates to Redis in one pipeline
+
+        HINCRBY is atomic, so counters stay correct across concurrent
+        workers; the running aggregate keys keep precision/recall O(1)
+        instead of a scan over every suggestion hash.
+        """
+        if not self._pending_weight_ops:
+            return
+        pending, self._pending_weight_ops = self._pending_weight_ops, []
+        try:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for suggestion_id, helpful, category in pending:
+                    pipe.hincrby(_FW_KEY.format(suggestion_id), "total", 1)
+                    pipe.hincrby(
+                        _FW_CATEGORY_KEY.format(suggestion_id, category), "total", 1
+                    )
+                    pipe.sadd(_FW_IDS_KEY, suggestion_id)
+                    pipe.incr(_FW_TOTAL_SUM_KEY)
+                    if helpful:
+                        pipe.hincrby(_FW_KEY.format(suggestion_id), "helpful", 1)
+                        pipe.hincrby(
+                            _FW_CATEGORY_KEY.format(suggestion_id, category),
+                            "helpful", 1
+                        )
+                        pipe.incr(_FW_HELPFUL_SUM_KEY)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(
+                "Feedback weight flush failed", count=len(pending), error=str(e)
+            )
 
     def _update_pattern_confidence(self, correction: str, helpful: bool):
         """Update pattern confidence based on corrections"""
@@ -157,44 +255,25 @@ class FeedbackLearner:
     def _extract_patterns_from_correction(self, correction: str) -> List[str]:
         """Extract patterns from correction text"""
         # Simple pattern extraction - this would be more sophisticated
-        patterns = []
-        
-        # Look for common patterns
-        if "null" in correction.lower():
-            patterns.append("null_check")
-        if "error" in correction.lower():
-            patterns.append("error_handling")
-        if "security" in correction.lower():
-            patterns.append("security")
-        if "performance" in correction.lower():
-            patterns.append("performance")
-        
-        return patterns
+        return list({
+            _CORRECTION_PATTERN_MAP[match.group(0).lower()]
+            for match in _CORRECTION_PATTERN_RE.finditer(correction)
+        })
 
     def _calculate_learning_impact(self, helpful: bool, category: str) -> float:
         """Calculate learning impact score"""
         base_impact = 0.1 if helpful else -0.05
-        
-        # Category-specific adjustments
-        category_weights = {
-            "security": 0.3,
-            "performance": 0.2,
-            "bug": 0.25,
-            "style": 0.1,
-            "maintainability": 0.15
-        }
-        
-        category_weight = category_weights.get(category, 0.1)
+        category_weight = _CATEGORY_WEIGHTS.get(category, _DEFAULT_CATEGORY_WEIGHT)
         return base_impact * category_weight
 
-    def _calculate_metrics(self) -> LearningMetrics:
+    async def _calculate_metrics(self) -> LearningMetrics:
         """Calculate current learning metrics"""
-        total_feedback = len(self.learning_history)
-        helpful_feedback = sum(1 for event in self.learning_history if event["helpful"])
-        
-        # Calculate precision and recall
-        precision = self._calculate_precision()
-        recall = self._calculate_recall()
+        total_feedback = self._event_count
+        helpful_feedback = int(self._helpful_arr[:self._event_count].sum())
+
+        # Precision and recall both derive from the same running
+        # aggregates; fetch them once instead of one round-trip each
+        precision = recall = await self._feedback_helpful_rate()
         f1_score = 2 * (precision * recall) / (precision + recall) if (precision + recall) > 0 else 0
         
         # Calculate confidence calibration
@@ -213,39 +292,32 @@ class FeedbackLearner:
             helpful_feedback=helpful_feedback
         )
 
-    def _calculate_precision(self) -> float:
-        """Calculate precision from feedback weights"""
-        if not self.feedback_weights:
+    async def _feedback_helpful_rate(self) -> float:
+        """Read the helpful-feedback rate from the running aggregates
+
+        Serves as both precision and the simplified recall, so callers
+        needing both should call this once.
+        """
+        try:
+            helpful, total = await redis_client.mget(
+                _FW_HELPFUL_SUM_KEY, _FW_TOTAL_SUM_KEY
+            )
+        except Exception as e:
+            logger.warning("Feedback aggregate read failed", error=str(e))
             return 0.0
-        
-        total_precision = 0.0
-        count = 0
-        
-        for suggestion_id, weights in self.feedback_weights.items():
-            if weights["total_feedback"] > 0:
-                precision = weights["helpful_feedback"] / weights["total_feedback"]
-                total_precision += precision
-                count += 1
-        
-        return total_precision / count if count > 0 else 0.0
 
-    def _calculate_recall(self) -> float:
-        """Calculate recall from feedback weights"""
-        # Simplified recall calculation
-        if not self.feedback_weights:
+        total = int(total or 0)
+        if total == 0:
             return 0.0
-        
-        total_recall = 0.0
-        count = 0
-        
-        for suggestion_id, weights in self.feedback_weights.items():
-            if weights["total_feedback"] > 0:
-                # Recall based on helpful feedback rate
-                recall = weights["helpful_feedback"] / weights["total_feedback"]
-                total_recall += recall
-                count += 1
-        
-        return total_recall / count if count > 0 else 0.0
+        return int(helpful or 0) / total
+
+    async def _calculate_precision(self) -> float:
+        """Calculate precision from feedback aggregates"""
+        return await self._feedback_helpful_rate()
+
+    async def _calculate_recall(self) -> float:
+        """Calculate recall from feedback aggregates"""
+        return await self._feedback_helpful_rate()
 
     def _calculate_confidence_calibration(self) -> float:
         """Calculate confidence calibration score"""
@@ -265,20 +337,12 @@ class FeedbackLearner:
 
     def _calculate_learning_velocity(self) -> float:
         """Calculate learning velocity over time"""
-        if len(self.learning_history) < 2:
+        # Improvement of the last 10 events over the 10 before them
+        if self._event_count < 20:
             return 0.0
-        
-        # Calculate improvement over time
-        recent_events = self.learning_history[-10:]  # Last 10 events
-        older_events = self.learning_history[-20:-10] if len(self.learning_history) >= 20 else []
-        
-        if not older_events:
-            return 0.0
-        
-        recent_helpful_rate = sum(1 for e in recent_events if e["helpful"]) / len(recent_events)
-        older_helpful_rate = sum(1 for e in older_events if e["helpful"]) / len(older_events)
-        
-        return recent_helpful_rate - older_helpful_rate
+
+        history = self._helpful_arr[:self._event_count]
+        return float(history[-10:].mean() - history[-20:-10].mean())
 
     def _calculate_batch_metrics(self, feedback_list: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Calculate metrics for batch processing"""
@@ -303,8 +367,14 @@ class FeedbackLearner:
 
     async def get_metrics(self, user_id: Optional[str] = None) -> Dict[str, Any]:
         """Get learning metrics for user or global"""
-        metrics = self._calculate_metrics()
-        
+        metrics = await self._calculate_metrics()
+
+        try:
+            tracked_suggestions = int(await redis_client.scard(_FW_IDS_KEY))
+        except Exception as e:
+            logger.warning("Feedback weight count failed", error=str(e))
+            tracked_suggestions = 0
+
         return {
             "precision": metrics.precision,
             "recall": metrics.recall,
@@ -313,26 +383,49 @@ class FeedbackLearner:
             "learning_velocity": metrics.learning_velocity,
             "total_feedback": metrics.total_feedback,
             "helpful_feedback": metrics.helpful_feedback,
-            "feedback_weights": len(self.feedback_weights),
+            "feedback_weights": tracked_suggestions,
             "pattern_confidence": len(self.pattern_confidence)
         }
 
-    def get_learning_history(self, limit: int = 100) -> List[Dict[str, Any]]:
+    def get_learning_history(self, limit: int = 100) -> List[LearningEvent]:
         """Get recent learning history"""
-        return self.learning_history[-limit:]
+        # Deques don't slice; islice from the tail without copying the rest
+        start = max(0, len(self.learning_history) - limit)
+        return list(itertools.islice(self.learning_history, start, None))
 
-    def export_learning_data(self) -> Dict[str, Any]:
+    async def export_learning_data(self) -> Dict[str, Any]:
         """Export learning data for analysis"""
+        # Timestamps are stored as floats on the hot path; render them as
+        # ISO strings only here, where the export is already off it
+        history = []
+        for event in self.learning_history:
+            entry = asdict(event)
+            entry["timestamp"] = datetime.fromtimestamp(
+                event.timestamp, tz=timezone.utc
+            ).isoformat()
+            history.append(entry)
+
         return {
-            "feedback_weights": self.feedback_weights,
             "pattern_confidence": self.pattern_confidence,
-            "learning_history": self.learning_history,
-            "metrics": self._calculate_metrics()
+            "learning_history": history,
+            "metrics": await self._calculate_metrics()
         }
 
-    def reset_learning(self):
+    async def reset_learning(self):
         """Reset learning data"""
-        self.feedback_weights.clear()
+        self._pending_weight_ops.clear()
         self.pattern_confidence.clear()
         self.learning_history.clear()
+        self._helpful_arr = np.empty(1024, dtype=bool)
+        self._event_count = 0
+
+        try:
+            keys = [_FW_IDS_KEY, _FW_TOTAL_SUM_KEY, _FW_HELPFUL_SUM_KEY]
+            async for key in redis_client.scan_iter(match="fw:*", count=500):
+                keys.append(key)
+            if keys:
+                await redis_client.delete(*keys)
+        except Exception as e:
+            logger.warning("Feedback weight reset failed", error=str(e))
+
         logger.info("Learning data reset")
@@ -1,37 +1,69 @@
 """
 LLM response caching for Code Review AI
 """
-import json
+import asyncio
+import copy
+import itertools
 import time
 from typing import Any, Optional, Dict
 from datetime import datetime, timedelta
 
+import orjson
 import structlog
 import redis.asyncio as redis
-from core.config import get_settings
+from core.config import CACHE_TTL_SECONDS, get_settings
 
 logger = structlog.get_logger(__name__)
 settings = get_settings()
 
+# Connection pool shared by every LLMCache instance in the process.
+# Caches are instantiated per task/request, so a per-instance pool would
+# redo the TCP handshakes the pool exists to amortize. Lazy creation is
+# race-free without a lock: there is no await between check and assign.
+_POOL: Optional[redis.ConnectionPool] = None
+
+
+def _get_pool() -> redis.ConnectionPool:
+    global _POOL
+    if _POOL is None:
+        # Bytes in, bytes out: values go straight to orjson.loads, which
+        # takes bytes, so response decoding would be pure waste. With
+        # hiredis installed redis-py parses RESP in C as well.
+        _POOL = redis.ConnectionPool.from_url(
+            settings.REDIS_URL,
+            max_connections=20,
+            retry_on_timeout=True,
+            decode_responses=False
+        )
+    return _POOL
+
+
+async def shutdown_pool() -> None:
+    """Disconnect the shared pool at process teardown"""
+    global _POOL
+    if _POOL is not None:
+        await _POOL.disconnect()
+        _POOL = None
+
 
 class LLMCache:
     """Redis-based cache for LLM responses"""
     
     def __init__(self):
         self.redis_client = None
-        self._connection_pool = None
-        self.hit_count = 0
-        self.miss_count = 0
+        # itertools.count advances in a single C call, so concurrent
+        # coroutines bump these without a read-modify-write in bytecode
+        self._hits = itertools.count()
+        self._misses = itertools.count()
+        # Strong references to in-flight fire-and-forget writes; the event
+        # loop only holds weak ones, so unanchored tasks can be collected
+        # mid-write
+        self._background_writes: set = set()
 
     async def _get_redis_client(self):
-        """Get Redis client with connection pooling"""
+        """Get Redis client backed by the shared connection pool"""
         if self.redis_client is None:
-            self._connection_pool = redis.ConnectionPool.from_url(
-                settings.REDIS_URL,
-                max_connections=20,
-                retry_on_timeout=True
-            )
-            self.redis_client = redis.Redis(connection_pool=self._connection_pool)
+            self.redis_client = redis.Redis(connection_pool=_get_pool())
         return self.redis_client
 
     async def get(self, key: str) -> Optional[Any]:
@@ -41,38 +73,109 @@ class LLMCache:
             cached_data = await client.get(key)
             
             if cached_data:
-                self.hit_count += 1
+                next(self._hits)
                 logger.debug("Cache hit", key=key)
-                return json.loads(cached_data)
+                return orjson.loads(cached_data)
             else:
-                self.miss_count += 1
+                next(self._misses)
                 logger.debug("Cache miss", key=key)
                 return None
                 
         except Exception as e:
             logger.warning("Cache get failed", key=key, error=str(e))
-            self.miss_count += 1
+            next(self._misses)
             return None
 
-    async def set(self, key: str, value: Any, ttl: int = None) -> bool:
-        """Set cached value with TTL"""
+    async def get_many(self, keys: list) -> Dict[str, Any]:
+        """Get multiple cached values in a single MGET round-trip"""
+        if not keys:
+            return {}
         try:
             client = await self._get_redis_client()
-            
+            raw_values = await client.mget(keys)
+
+            found = {
+                key: orjson.loads(raw)
+                for key, raw in zip(keys, raw_values)
+                if raw is not None
+            }
+            self._advance(self._hits, len(found))
+            self._advance(self._misses, len(keys) - len(found))
+            logger.debug("Cache bulk get", requested=len(keys), hits=len(found))
+            return found
+
+        except Exception as e:
+            logger.warning("Cache bulk get failed", key_count=len(keys), error=str(e))
+            self._advance(self._misses, len(keys))
+            return {}
+
+    async def set_many(self, values: Dict[str, Any], ttl: int = None) -> bool:
+        """Set multiple cached values in one pipeline"""
+        if not values:
+            return True
+        try:
+            client = await self._get_redis_client()
+            if ttl is None:
+                ttl = CACHE_TTL_SECONDS
+
+            async with client.pipeline(transaction=False) as pipe:
+                for key, value in values.items():
+                    pipe.setex(key, ttl, orjson.dumps(value, default=str))
+                await pipe.execute()
+
+            logger.debug("Cache bulk set", key_count=len(values), ttl=ttl)
+            return True
+
+        except Exception as e:
+            logger.warning("Cache bulk set failed", key_count=len(values), error=str(e))
+            return False
+
+    async def set(self, key: str, value: Any, ttl: int = None,
+                  fire_and_forget: bool = False) -> bool:
+        """Set cached value with TTL
+
+        With fire_and_forget=True the Redis round-trip happens in a
+        background task and the caller continues immediately — cache
+        writes already swallow failures, so callers on the analysis
+        critical path gain nothing by waiting for the reply.
+        """
+        try:
+            client = await self._get_redis_client()
+
             # Use default TTL if not specified
             if ttl is None:
-                ttl = settings.CACHE_TTL_DAYS * 24 * 3600  # Convert days to seconds
-            
-            serialized_value = json.dumps(value, default=str)
+                ttl = CACHE_TTL_SECONDS
+
+            # orjson emits bytes directly (datetimes/UUIDs natively), so
+            # Redis gets the payload without an intermediate str
+            serialized_value = orjson.dumps(value, default=str)
+
+            if fire_and_forget:
+                task = asyncio.create_task(
+                    self._set_in_background(client, key, ttl, serialized_value)
+                )
+                self._background_writes.add(task)
+                task.add_done_callback(self._background_writes.discard)
+                return True
+
             result = await client.setex(key, ttl, serialized_value)
-            
+
             logger.debug("Cache set", key=key, ttl=ttl)
             return result
-            
+
         except Exception as e:
             logger.warning("Cache set failed", key=key, error=str(e))
             return False
 
+    async def _set_in_background(self, client, key: str, ttl: int,
+                                 serialized_value: bytes) -> None:
+        """Perform a detached cache write, logging failures"""
+        try:
+            await client.setex(key, ttl, serialized_value)
+            logger.debug("Cache set", key=key, ttl=ttl)
+        except Exception as e:
+            logger.warning("Cache set failed", key=key, error=str(e))
+
     async def delete(self, key: str) -> bool:
         """Delete cached value"""
         try:
@@ -119,34 +222,67 @@ class LLMCache:
             logger.warning("Cache TTL extension failed", key=key, error=str(e))
             return False
 
+    @staticmethod
+    def _advance(counter, n: int) -> None:
+        """Advance a count iterator by n without a Python-level loop"""
+        if n > 0:
+            next(itertools.islice(counter, n - 1, None))
+
+    @property
+    def hit_count(self) -> int:
+        """Number of cache hits so far"""
+        # A copy of a count iterator yields the original's next value
+        # without consuming it
+        return next(copy.copy(self._hits))
+
+    @property
+    def miss_count(self) -> int:
+        """Number of cache misses so far"""
+        return next(copy.copy(self._misses))
+
     def get_hit_rate(self) -> float:
         """Get cache hit rate"""
-        total_requests = self.hit_count + self.miss_count
+        hits, misses = self.hit_count, self.miss_count
+        total_requests = hits + misses
         if total_requests == 0:
             return 0.0
-        return self.hit_count / total_requests
+        return hits / total_requests
 
     def get_stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
+        hits, misses = self.hit_count, self.miss_count
+        total_requests = hits + misses
         return {
-            "hit_count": self.hit_count,
-            "miss_count": self.miss_count,
-            "hit_rate": self.get_hit_rate(),
-            "total_requests": self.hit_count + self.miss_count
+            "hit_count": hits,
+            "miss_count": misses,
+            "hit_rate": hits / total_requests if total_requests else 0.0,
+            "total_requests": total_requests
         }
 
+    # Batch size for cursor-based key iteration
+    _SCAN_COUNT = 500
+
     async def clear_pattern(self, pattern: str) -> int:
         """Clear all keys matching pattern"""
         try:
             client = await self._get_redis_client()
-            keys = await client.keys(pattern)
-            
-            if keys:
-                deleted_count = await client.delete(*keys)
+            deleted_count = 0
+            batch = []
+
+            # SCAN iterates without blocking Redis or materializing the
+            # whole keyspace the way KEYS does
+            async for key in client.scan_iter(match=pattern, count=self._SCAN_COUNT):
+                batch.append(key)
+                if len(batch) >= self._SCAN_COUNT:
+                    deleted_count += await client.delete(*batch)
+                    batch = []
+            if batch:
+                deleted_count += await client.delete(*batch)
+
+            if deleted_count:
                 logger.info("Cache pattern cleared", pattern=pattern, deleted_count=deleted_count)
-                return deleted_count
-            return 0
-            
+            return deleted_count
+
         except Exception as e:
             logger.warning("Cache pattern clear failed", pattern=pattern, error=str(e))
             return 0
@@ -155,49 +291,70 @@ class LLMCache:
         """Clean up expired keys (Redis handles this automatically, but useful for monitoring)"""
         try:
             client = await self._get_redis_client()
-            
-            # Get all cache keys
-            keys = await client.keys("llm_analysis:*")
             expired_count = 0
-            
-            for key in keys:
-                ttl = await client.ttl(key)
-                if ttl == -2:  # Key doesn't exist
-                    expired_count += 1
-                elif ttl == -1:  # Key exists but has no expiration
-                    # Set expiration for keys without TTL
-                    await client.expire(key, settings.CACHE_TTL_DAYS * 24 * 3600)
-            
+            batch = []
+
+            async for key in client.scan_iter(match="llm_analysis:*", count=self._SCAN_COUNT):
+                batch.append(key)
+                if len(batch) >= self._SCAN_COUNT:
+                    expired_count += await self._reap_batch(client, batch)
+                    batch = []
+            if batch:
+                expired_count += await self._reap_batch(client, batch)
+
             logger.info("Cache cleanup completed", expired_count=expired_count)
             return expired_count
-            
+
         except Exception as e:
             logger.warning("Cache cleanup failed", error=str(e))
             return 0
 
+    async def _reap_batch(self, client, keys: list) -> int:
+        """TTL-check a batch of keys in one pipeline, expiring TTL-less ones"""
+        async with client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.ttl(key)
+            ttls = await pipe.execute()
+
+        expired_count = 0
+        async with client.pipeline(transaction=False) as pipe:
+            for key, ttl in zip(keys, ttls):
+                if ttl == -2:  # Key no longer exists
+                    expired_count += 1
+                elif ttl == -1:  # Key exists but has no expiration
+                    pipe.expire(key, CACHE_TTL_SECONDS)
+            await pipe.execute()
+        return expired_count
+
     async def get_memory_usage(self) -> Dict[str, Any]:
         """Get cache memory usage statistics"""
         try:
             client = await self._get_redis_client()
             info = await client.info("memory")
-            
+
+            cache_keys = 0
+            async for _ in client.scan_iter(match="llm_analysis:*", count=self._SCAN_COUNT):
+                cache_keys += 1
+
             return {
                 "used_memory": info.get("used_memory", 0),
                 "used_memory_human": info.get("used_memory_human", "0B"),
                 "maxmemory": info.get("maxmemory", 0),
                 "maxmemory_human": info.get("maxmemory_human", "0B"),
-                "cache_keys": len(await client.keys("llm_analysis:*"))
+                "cache_keys": cache_keys
             }
-            
+
         except Exception as e:
             logger.warning("Cache memory usage check failed", error=str(e))
             return {}
 
     async def close(self):
-        """Close Redis connection"""
+        """Release this instance's client; the shared pool stays up
+
+        Process teardown should call shutdown_pool() once instead.
+        """
+        if self._background_writes:
+            await asyncio.gather(*self._background_writes, return_exceptions=True)
         if self.redis_client:
             await self.redis_client.close()
             self.redis_client = None
-        if self._connection_pool:
-            await self._connection_pool.disconnect()
-            self._connection_pool = None
@@ -1,23 +1,359 @@
 """
 LLM client for Code Review AI
 """
-import json
+import asyncio
+import hashlib
+import io
+import re
 import time
-from typing import List, Dict, Any, Optional
+from functools import lru_cache
+from typing import AsyncIterator, List, Dict, Any, Optional
 from dataclasses import dataclass
 
+import numpy as np
+import orjson
 import structlog
 import openai
-from anthropic import Anthropic
+from anthropic import AsyncAnthropic
+
+try:
+    # Recent openai/anthropic SDK majors run on the httpx2 transport and
+    # reject plain httpx clients
+    import httpx2 as httpx
+except ImportError:
+    import httpx
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
 
 from core.config import get_settings
 from core.llm.cache import LLMCache
 from core.llm.prompts import PromptManager
-from observability.metrics import record_llm_metrics
+from observability.metrics import record_llm_call
 
 logger = structlog.get_logger(__name__)
 settings = get_settings()
 
+# One HTTP transport for both provider SDKs (each wraps httpx). Sharing
+# it means TLS handshakes are paid once per connection rather than per
+# LLMClient instance, and HTTP/2 multiplexes concurrent in-flight
+# requests over the same sockets.
+_HTTP_CLIENT = httpx.AsyncClient(
+    http2=True,
+    timeout=httpx.Timeout(60.0),
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+)
+
+
+async def shutdown_http_client() -> None:
+    """Close the shared HTTP transport at process teardown"""
+    await _HTTP_CLIENT.aclose()
+
+
+# Bounds in-flight provider calls process-wide so a burst of analyses
+# queues here instead of tripping provider rate limits or exhausting the
+# connection pool
+_LLM_SEMAPHORE = asyncio.Semaphore(settings.LLM_CONCURRENCY)
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Single pass over each text-response line: captures the field name and
+# value together, replacing the old startswith/replace chain that
+# re-scanned every line up to six times in Python. The colon floats on
+# both sides of the closing ** because models emit both "**Issue:** ..."
+# and "**Issue**: ..." (plus the unbolded "Issue: ...").
+_FIELD_RE = re.compile(r"^(?:\*\*)?(Issue|Severity|Description):?(?:\*\*)?:?\s*(.*)$")
+
+# field name -> (suggestion key, value transform)
+_FIELD_DISPATCH = {
+    "Severity": ("severity", str.lower),
+    "Description": ("description", str),
+}
+
+# Confidence boost per severity level, shared by the scalar and
+# vectorized scoring paths
+_SEVERITY_BONUS = {"high": 0.2, "medium": 0.1}
+
+# Below this many suggestions the plain Python loop beats NumPy's
+# array-construction overhead
+_SCORE_BATCH_THRESHOLD = 32
+
+# Provider pricing in integer micro-USD per (input, output) token.
+# Costs accumulate exactly in int arithmetic — repeated tiny-float
+# multiplies drift once aggregated over millions of calls — and are
+# converted to float dollars only at the reporting boundary.
+_PRICE_MICRO = {
+    "anthropic": (3, 15),
+    "openai": (30, 60),
+}
+
+# Git output that varies between otherwise-identical diffs: blob hashes
+# in `index abc123..def456` lines and mode churn alongside them
+_VOLATILE_DIFF_LINE_RE = re.compile(r"^index [0-9a-f]+\.\.[0-9a-f]+[^\n]*\n?", re.MULTILINE)
+
+
+# Lazily-built tokenizer shared by every prompt-size estimate; building
+# a tiktoken encoding is expensive, counting with it is not
+_ENCODER = None
+
+
+def _count_prompt_tokens(text: str) -> int:
+    """Estimate input tokens with a single C-level tokenization
+
+    cl100k_base is exact for the OpenAI models we call and a close
+    approximation for Claude; close is enough for budget gating. Falls
+    back to the ~4-chars-per-token heuristic when tiktoken is absent.
+    """
+    global _ENCODER
+    if _ENCODER is None:
+        if tiktoken is None:
+            _ENCODER = False
+        else:
+            try:
+                _ENCODER = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                # First use downloads the BPE ranks; stay on the
+                # heuristic if that fails (offline environments)
+                logger.warning("tiktoken encoding unavailable", error=str(e))
+                _ENCODER = False
+    if _ENCODER is False:
+        return len(text) // 4
+    return len(_ENCODER.encode(text))
+
+
+def _canonicalize_diff(diff_content: str) -> str:
+    """Normalize a diff so equivalent PR content hashes identically"""
+    return _VOLATILE_DIFF_LINE_RE.sub(
+        "", diff_content.replace("\r\n", "\n")
+    ).strip()
+
+
+def _repair_json(content: str) -> str:
+    """Best-effort repair of truncated or slightly malformed LLM JSON
+
+    Token-limit truncation and stray prose are the two common ways model
+    output fails orjson.loads. A single O(n) pass fixes what it can —
+    leading/trailing prose and markdown fences are trimmed, single-quoted
+    strings and Python literals (None/True/False) are rewritten, trailing
+    commas are dropped, and any brackets or strings left open by
+    truncation are closed — so structured suggestions survive instead of
+    falling through to the lossy text parser.
+    """
+    starts = [i for i in (content.find("{"), content.find("[")) if i != -1]
+    if not starts:
+        return content
+    content = content[min(starts):]
+
+    out: List[str] = []
+    stack: List[str] = []
+    in_string = False
+    escaped = False
+    i = 0
+    n = len(content)
+
+    while i < n:
+        char = content[i]
+        if in_string:
+            out.append(char)
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            i += 1
+            continue
+        if char == '"':
+            in_string = True
+            out.append(char)
+            i += 1
+            continue
+        if char == "'":
+            # Rewrite a single-quoted string as double-quoted
+            out.append('"')
+            i += 1
+            while i < n and content[i] != "'":
+                if content[i] == '"':
+                    out.append('\\"')
+                elif content[i] == "\\" and i + 1 < n:
+                    out.append(content[i:i + 2])
+                    i += 1
+                else:
+                    out.append(content[i])
+                i += 1
+            out.append('"')
+            i += 1
+            continue
+        if char in "{[":
+            stack.append(char)
+            out.append(char)
+            i += 1
+            continue
+        if char in "}]":
+            # Drop a trailing comma before the closer
+            j = len(out) - 1
+            while j >= 0 and out[j] in " \t\r\n":
+                j -= 1
+            if j >= 0 and out[j] == ",":
+                del out[j]
+            if stack:
+                stack.pop()
+            out.append(char)
+            i += 1
+            if not stack:
+                # First complete document ends here; anything after it
+                # is trailing prose or a closing fence
+                break
+            continue
+        if content.startswith("None", i):
+            out.append("null")
+            i += 4
+            continue
+        if content.startswith("True", i):
+            out.append("true")
+            i += 4
+            continue
+        if content.startswith("False", i):
+            out.append("false")
+            i += 5
+            continue
+        out.append(char)
+        i += 1
+
+    if escaped:
+        # A lone backslash cut off mid-escape cannot be completed
+        out.pop()
+    if in_string:
+        out.append('"')
+
+    repaired = "".join(out).rstrip()
+    if repaired.endswith(","):
+        repaired = repaired[:-1].rstrip()
+    if repaired.endswith(":"):
+        repaired += " null"
+    repaired += "".join("}" if opener == "{" else "]" for opener in reversed(stack))
+    return repaired
+
+
+class _SemanticIndex:
+    """In-memory cosine-similarity index over diff fingerprints
+
+    Second cache tier behind the exact Redis lookup: diffs that differ
+    only in whitespace, line numbers, or light rewording land near the
+    same token-count vector, so a high-similarity neighbour's suggestions
+    can be served without an LLM call. Fixed capacity, ring-overwritten.
+    """
+
+    DIM = 256
+    CAPACITY = 1024
+
+    def __init__(self):
+        self._vectors = np.zeros((self.CAPACITY, self.DIM), dtype=np.float32)
+        self._results: List[Optional[List[Dict[str, Any]]]] = [None] * self.CAPACITY
+        self._size = 0
+        self._cursor = 0
+
+    @classmethod
+    def embed(cls, text: str) -> np.ndarray:
+        """Hash tokens into a normalized count vector"""
+        vector = np.zeros(cls.DIM, dtype=np.float32)
+        for token in _TOKEN_RE.findall(text.lower()):
+            vector[hash(token) % cls.DIM] += 1.0
+        norm = float(np.linalg.norm(vector))
+        if norm > 0.0:
+            vector /= norm
+        return vector
+
+    def search(self, vector: np.ndarray, threshold: float):
+        """Return the best match above threshold, or None"""
+        if self._size == 0:
+            return None
+        similarities = self._vectors[:self._size] @ vector
+        best = int(np.argmax(similarities))
+        if similarities[best] >= threshold:
+            return self._results[best], float(similarities[best])
+        return None
+
+    def add(self, vector: np.ndarray, result: List[Dict[str, Any]]) -> None:
+        self._vectors[self._cursor] = vector
+        self._results[self._cursor] = result
+        self._cursor = (self._cursor + 1) % self.CAPACITY
+        self._size = min(self._size + 1, self.CAPACITY)
+
+
+# Process-wide so every LLMClient instance shares the same hits
+_SEMANTIC_INDEX = _SemanticIndex()
+
+
+class _StreamingJsonParser:
+    """Incremental JSON parser for streamed LLM responses
+
+    Feed raw text deltas as they arrive off the wire; each object inside
+    the response's suggestions array is decoded and returned as soon as
+    its closing brace lands, so consumers see the first suggestion while
+    the model is still generating the rest. A small character-level
+    stack machine tracks string/escape state and bracket depth — no
+    re-parsing of already-consumed text on each delta.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escaped = False
+        self._element_start: Optional[int] = None
+        self._element_depth = 0
+
+    def feed(self, delta: str) -> List[Dict[str, Any]]:
+        """Consume a text delta and return any suggestions it completed"""
+        self._text += delta
+        completed: List[Dict[str, Any]] = []
+
+        while self._pos < len(self._text):
+            char = self._text[self._pos]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                if (
+                    char == "{"
+                    and self._element_start is None
+                    and self._stack
+                    and self._stack[-1] == "["
+                ):
+                    self._element_start = self._pos
+                    self._element_depth = len(self._stack)
+                self._stack.append(char)
+            elif char in "}]":
+                if self._stack:
+                    self._stack.pop()
+                if (
+                    char == "}"
+                    and self._element_start is not None
+                    and len(self._stack) == self._element_depth
+                ):
+                    try:
+                        element = orjson.loads(
+                            self._text[self._element_start:self._pos + 1]
+                        )
+                        if isinstance(element, dict):
+                            completed.append(element)
+                    except orjson.JSONDecodeError:
+                        pass
+                    self._element_start = None
+            self._pos += 1
+
+        return completed
+
 
 @dataclass
 class LLMResponse:
@@ -30,14 +366,45 @@ class LLMResponse:
     cached: bool = False
 
 
+# LLMClient is constructed per request by the web layer and per task by
+# the workers; the expensive pieces — SDK clients with their connection
+# pools, the cache, the loaded prompt templates — are process-wide
+# singletons built lazily on first use so each construction just takes
+# references.
+@lru_cache(maxsize=1)
+def _get_openai_client() -> openai.AsyncOpenAI:
+    return openai.AsyncOpenAI(
+        api_key=settings.OPENAI_API_KEY,
+        http_client=_HTTP_CLIENT
+    )
+
+
+@lru_cache(maxsize=1)
+def _get_anthropic_client() -> AsyncAnthropic:
+    return AsyncAnthropic(
+        api_key=settings.ANTHROPIC_API_KEY,
+        http_client=_HTTP_CLIENT
+    )
+
+
+@lru_cache(maxsize=1)
+def _get_cache() -> LLMCache:
+    return LLMCache()
+
+
+@lru_cache(maxsize=1)
+def _get_prompt_manager() -> PromptManager:
+    return PromptManager()
+
+
 class LLMClient:
     """Unified LLM client for multiple providers"""
-    
+
     def __init__(self):
-        self.openai_client = openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
-        self.anthropic_client = Anthropic(api_key=settings.ANTHROPIC_API_KEY)
-        self.cache = LLMCache()
-        self.prompt_manager = PromptManager()
+        self.openai_client = _get_openai_client()
+        self.anthropic_client = _get_anthropic_client()
+        self.cache = _get_cache()
+        self.prompt_manager = _get_prompt_manager()
         self.token_usage = {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
 
     async def analyze_code(
@@ -61,16 +428,33 @@ class LLMClient:
 
             # Check cache first
             cache_key = self._generate_cache_key(diff_content, file_paths)
-            cached_result = self.cache.get(cache_key)
+            cached_result = await self.cache.get(cache_key)
             if cached_result:
                 logger.info("Using cached LLM result")
                 return cached_result
 
+            # Second tier: near-duplicate diffs (reformatted, rebased)
+            # miss the exact hash but sit next to each other in the
+            # semantic index
+            diff_vector = None
+            if settings.SEMANTIC_CACHE_ENABLED:
+                diff_vector = _SEMANTIC_INDEX.embed(diff_content)
+                match = _SEMANTIC_INDEX.search(
+                    diff_vector, settings.SEMANTIC_CACHE_THRESHOLD
+                )
+                if match is not None:
+                    suggestions, similarity = match
+                    logger.info(
+                        "Using semantic cache result", similarity=similarity
+                    )
+                    return suggestions
+
             # Prepare context
             context_text = self._prepare_context(context_docs)
             
-            # Get analysis prompt
-            prompt = self.prompt_manager.get_analysis_prompt(
+            # Get analysis prompt, split so the static instruction block
+            # can hit the provider-side prompt cache
+            messages = self.prompt_manager.get_analysis_messages(
                 diff_content=diff_content,
                 context=context_text,
                 file_paths=file_paths,
@@ -78,7 +462,9 @@ class LLMClient:
             )
 
             # Call LLM
-            response = await self._call_llm(prompt)
+            response = await self._call_llm(
+                messages["user"], system=messages["system"]
+            )
             
             # Parse response
             suggestions = self._parse_analysis_response(response.content)
@@ -86,18 +472,28 @@ class LLMClient:
             # Add confidence scores
             suggestions = self._add_confidence_scores(suggestions)
             
-            # Cache result
-            self.cache.set(cache_key, suggestions, ttl=settings.CACHE_TTL_DAYS * 24 * 3600)
+            # Cache result in the background: the write outcome doesn't
+            # affect this response, so don't spend a Redis RTT on it
+            await self.cache.set(
+                cache_key,
+                suggestions,
+                ttl=settings.CACHE_TTL_DAYS * 24 * 3600,
+                fire_and_forget=True
+            )
+            if diff_vector is not None:
+                _SEMANTIC_INDEX.add(diff_vector, suggestions)
             
             processing_time = time.time() - start_time
             
             # Record metrics
-            record_llm_metrics(
+            provider = "anthropic" if response.model.startswith("claude") else "openai"
+            record_llm_call(
                 model=response.model,
-                usage=response.usage,
+                provider=provider,
+                input_tokens=response.usage["input_tokens"],
+                output_tokens=response.usage["output_tokens"],
                 cost=response.cost,
-                processing_time=processing_time,
-                cached=False
+                duration=processing_time
             )
 
             logger.info(
@@ -113,33 +509,229 @@ class LLMClient:
             logger.error("LLM analysis failed", error=str(e))
             raise
 
-    async def _call_llm(self, prompt: str) -> LLMResponse:
+    async def analyze_code_stream(
+        self,
+        diff_content: str,
+        context_docs: List[Dict[str, Any]],
+        file_paths: List[str],
+        repository_url: str
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Analyze code changes, yielding suggestions as the LLM streams them
+
+        Same contract as analyze_code, but the provider response is
+        consumed as an SSE stream and fed through an incremental JSON
+        parser, so the first suggestion is available seconds before
+        generation finishes. Cache tiers are shared with analyze_code;
+        the full suggestion list is written back once the stream ends.
+        """
+        cache_key = self._generate_cache_key(diff_content, file_paths)
+        cached_result = await self.cache.get(cache_key)
+        if cached_result:
+            logger.info("Using cached LLM result")
+            for suggestion in cached_result:
+                yield suggestion
+            return
+
+        diff_vector = None
+        if settings.SEMANTIC_CACHE_ENABLED:
+            diff_vector = _SEMANTIC_INDEX.embed(diff_content)
+            match = _SEMANTIC_INDEX.search(
+                diff_vector, settings.SEMANTIC_CACHE_THRESHOLD
+            )
+            if match is not None:
+                suggestions, similarity = match
+                logger.info("Using semantic cache result", similarity=similarity)
+                for suggestion in suggestions:
+                    yield suggestion
+                return
+
+        context_text = self._prepare_context(context_docs)
+        messages = self.prompt_manager.get_analysis_messages(
+            diff_content=diff_content,
+            context=context_text,
+            file_paths=file_paths,
+            repository_url=repository_url
+        )
+
+        parser = _StreamingJsonParser()
+        chunks: List[str] = []
+        suggestions: List[Dict[str, Any]] = []
+
+        async for delta in self._stream_llm(
+            messages["user"], system=messages["system"]
+        ):
+            chunks.append(delta)
+            for suggestion in parser.feed(delta):
+                self._add_confidence_scores([suggestion])
+                suggestions.append(suggestion)
+                yield suggestion
+
+        if not suggestions:
+            # The model answered in prose rather than JSON; recover what
+            # we can from the buffered response
+            suggestions = self._add_confidence_scores(
+                self._parse_analysis_response("".join(chunks))
+            )
+            for suggestion in suggestions:
+                yield suggestion
+
+        await self.cache.set(
+            cache_key,
+            suggestions,
+            ttl=settings.CACHE_TTL_DAYS * 24 * 3600,
+            fire_and_forget=True
+        )
+        if diff_vector is not None:
+            _SEMANTIC_INDEX.add(diff_vector, suggestions)
+
+    async def analyze_code_batch(
+        self,
+        requests: List[Dict[str, Any]]
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Analyze multiple code changes concurrently
+
+        Each entry takes the analyze_code keyword arguments. Calls run in
+        parallel up to the shared concurrency cap, so a burst of reviews
+        overlaps provider round-trips instead of serializing them.
+        """
+        logger.info("Starting batch LLM analysis", request_count=len(requests))
+        return await asyncio.gather(
+            *(self.analyze_code(**request) for request in requests)
+        )
+
+    async def _call_llm(
+        self,
+        prompt: str,
+        system: Optional[List[Dict[str, Any]]] = None
+    ) -> LLMResponse:
         """Call the appropriate LLM based on configuration"""
         start_time = time.time()
-        
+
         try:
-            if settings.LLM_MODEL_PRIMARY.startswith("claude"):
-                return await self._call_anthropic(prompt)
-            elif settings.LLM_MODEL_PRIMARY.startswith("gpt"):
-                return await self._call_openai(prompt)
-            else:
-                raise ValueError(f"Unsupported model: {settings.LLM_MODEL_PRIMARY}")
+            self._check_prompt_budget(prompt, system)
+            async with _LLM_SEMAPHORE:
+                if settings.LLM_MODEL_PRIMARY.startswith("claude"):
+                    return await self._call_anthropic(prompt, system=system)
+                elif settings.LLM_MODEL_PRIMARY.startswith("gpt"):
+                    return await self._call_openai(prompt, system=system)
+                else:
+                    raise ValueError(f"Unsupported model: {settings.LLM_MODEL_PRIMARY}")
                 
         except Exception as e:
             logger.error("LLM call failed", error=str(e))
             raise
 
-    async def _call_anthropic(self, prompt: str) -> LLMResponse:
+    def _check_prompt_budget(
+        self,
+        prompt: str,
+        system: Optional[List[Dict[str, Any]]] = None
+    ) -> int:
+        """Reject known-too-large prompts before paying for the call
+
+        One tokenization up front estimates the input tokens the
+        provider would bill; a prompt over LLM_MAX_INPUT_TOKENS would
+        either be rejected provider-side or burn budget on a response
+        the context cap was meant to prevent, so it fails here instead.
+        """
+        text = prompt
+        if system:
+            text = "".join(block["text"] for block in system) + prompt
+        input_tokens = _count_prompt_tokens(text)
+        if input_tokens > settings.LLM_MAX_INPUT_TOKENS:
+            raise ValueError(
+                f"Prompt estimated at {input_tokens} input tokens exceeds "
+                f"LLM_MAX_INPUT_TOKENS ({settings.LLM_MAX_INPUT_TOKENS})"
+            )
+        return input_tokens
+
+    async def _stream_llm(
+        self,
+        prompt: str,
+        system: Optional[List[Dict[str, Any]]] = None
+    ) -> AsyncIterator[str]:
+        """Stream text deltas from the configured LLM"""
+        self._check_prompt_budget(prompt, system)
+        async with _LLM_SEMAPHORE:
+            if settings.LLM_MODEL_PRIMARY.startswith("claude"):
+                stream = self._stream_anthropic(prompt, system=system)
+            elif settings.LLM_MODEL_PRIMARY.startswith("gpt"):
+                stream = self._stream_openai(prompt, system=system)
+            else:
+                raise ValueError(f"Unsupported model: {settings.LLM_MODEL_PRIMARY}")
+
+            async for delta in stream:
+                yield delta
+
+    async def _stream_anthropic(
+        self,
+        prompt: str,
+        system: Optional[List[Dict[str, Any]]] = None
+    ) -> AsyncIterator[str]:
+        """Stream text deltas from Anthropic Claude"""
+        request_kwargs: Dict[str, Any] = {
+            "model": settings.LLM_MODEL_PRIMARY,
+            "max_tokens": settings.LLM_MAX_TOKENS,
+            "temperature": settings.LLM_TEMPERATURE,
+            "messages": [{"role": "user", "content": prompt}],
+            "stream": True
+        }
+        if system:
+            request_kwargs["system"] = system
+
+        stream = await self.anthropic_client.messages.create(**request_kwargs)
+        async for event in stream:
+            if event.type == "content_block_delta":
+                yield event.delta.text
+
+    async def _stream_openai(
+        self,
+        prompt: str,
+        system: Optional[List[Dict[str, Any]]] = None
+    ) -> AsyncIterator[str]:
+        """Stream text deltas from OpenAI GPT"""
+        chat_messages: List[Dict[str, str]] = []
+        if system:
+            chat_messages.append({
+                "role": "system",
+                "content": "\n\n".join(block["text"] for block in system)
+            })
+        chat_messages.append({"role": "user", "content": prompt})
+
+        stream = await self.openai_client.chat.completions.create(
+            model=settings.LLM_MODEL_PRIMARY,
+            max_tokens=settings.LLM_MAX_TOKENS,
+            temperature=settings.LLM_TEMPERATURE,
+            messages=chat_messages,
+            stream=True
+        )
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+
+    async def _call_anthropic(
+        self,
+        prompt: str,
+        system: Optional[List[Dict[str, Any]]] = None
+    ) -> LLMResponse:
         """Call Anthropic Claude"""
         start_time = time.time()
-        
+
         try:
-            response = await self.anthropic_client.messages.create(
-                model=settings.LLM_MODEL_PRIMARY,
-                max_tokens=settings.LLM_MAX_TOKENS,
-                temperature=settings.LLM_TEMPERATURE,
-                messages=[{"role": "user", "content": prompt}]
-            )
+            request_kwargs: Dict[str, Any] = {
+                "model": settings.LLM_MODEL_PRIMARY,
+                "max_tokens": settings.LLM_MAX_TOKENS,
+                "temperature": settings.LLM_TEMPERATURE,
+                "messages": [{"role": "user", "content": prompt}]
+            }
+            if system:
+                # cache_control-tagged blocks are billed at the cached
+                # input-token rate on repeat calls
+                request_kwargs["system"] = system
+
+            response = await self.anthropic_client.messages.create(**request_kwargs)
             
             processing_time = time.time() - start_time
             
@@ -164,16 +756,30 @@ class LLMClient:
             logger.error("Anthropic API call failed", error=str(e))
             raise
 
-    async def _call_openai(self, prompt: str) -> LLMResponse:
+    async def _call_openai(
+        self,
+        prompt: str,
+        system: Optional[List[Dict[str, Any]]] = None
+    ) -> LLMResponse:
         """Call OpenAI GPT"""
         start_time = time.time()
-        
+
         try:
+            # OpenAI caches long stable prompt prefixes automatically, so
+            # the static block just becomes a leading system message
+            chat_messages: List[Dict[str, str]] = []
+            if system:
+                chat_messages.append({
+                    "role": "system",
+                    "content": "\n\n".join(block["text"] for block in system)
+                })
+            chat_messages.append({"role": "user", "content": prompt})
+
             response = await self.openai_client.chat.completions.create(
                 model=settings.LLM_MODEL_PRIMARY,
                 max_tokens=settings.LLM_MAX_TOKENS,
                 temperature=settings.LLM_TEMPERATURE,
-                messages=[{"role": "user", "content": prompt}]
+                messages=chat_messages
             )
             
             processing_time = time.time() - start_time
@@ -200,120 +806,176 @@ class LLMClient:
             raise
 
     def _prepare_context(self, context_docs: List[Dict[str, Any]]) -> str:
-        """Prepare context from retrieved documents"""
+        """Prepare context from retrieved documents
+
+        Writes straight into one StringIO buffer instead of a parts list
+        plus join, and stops at MAX_CONTEXT_CHARS: retrieved documents
+        are unbounded, and an oversized context both slows the LLM call
+        and inflates the tokens billed for it.
+        """
         if not context_docs:
             return ""
-        
-        context_parts = []
+
+        buf = io.StringIO()
+        remaining = settings.MAX_CONTEXT_CHARS
         for doc in context_docs[:5]:  # Limit to top 5 most relevant
-            context_parts.append(f"File: {doc.get('file_path', 'Unknown')}")
-            context_parts.append(f"Content: {doc.get('content', '')}")
-            context_parts.append("---")
-        
-        return "\n".join(context_parts)
+            buf.write(f"File: {doc.get('file_path', 'Unknown')}\n")
+            content = doc.get('content', '')
+            if len(content) > remaining:
+                content = content[:remaining]
+            buf.write(f"Content: {content}\n")
+            buf.write("---\n")
+            remaining -= len(content)
+            if remaining <= 0:
+                break
+
+        # Match the join-based output: no trailing newline
+        return buf.getvalue()[:-1]
 
     def _generate_cache_key(self, diff_content: str, file_paths: List[str]) -> str:
         """Generate cache key for request"""
-        import hashlib
-        
-        content_hash = hashlib.sha256(
-            f"{diff_content}:{':'.join(file_paths)}".encode()
-        ).hexdigest()
-        
-        return f"llm_analysis:{content_hash}"
+        # blake2b is the fastest hash in hashlib and this key only needs
+        # to be a stable fingerprint, not cryptographic. Feeding the
+        # hasher incrementally also skips building a joined copy of the
+        # (potentially multi-KB) diff just to hash it.
+        # Canonicalizing first (CRLF folding, volatile index lines,
+        # sorted paths) stops identical PR content missing the cache on
+        # git output jitter; the model and temperature are mixed in so a
+        # config change cannot serve stale suggestions.
+        hasher = hashlib.blake2b(
+            _canonicalize_diff(diff_content).encode(), digest_size=16
+        )
+        for path in sorted(file_paths):
+            hasher.update(b":")
+            hasher.update(path.encode())
+        hasher.update(
+            f":{settings.LLM_MODEL_PRIMARY}:{settings.LLM_TEMPERATURE}".encode()
+        )
+
+        return f"llm_analysis:{hasher.hexdigest()}"
 
     def _parse_analysis_response(self, content: str) -> List[Dict[str, Any]]:
         """Parse LLM response into structured suggestions"""
+        # Try to parse as JSON first, repairing truncated or slightly
+        # malformed output before giving up on the structured path
         try:
-            # Try to parse as JSON first
-            if content.strip().startswith("{"):
-                data = json.loads(content)
-                if isinstance(data, list):
-                    return data
-                elif isinstance(data, dict) and "suggestions" in data:
-                    return data["suggestions"]
-            
-            # Fallback to text parsing
-            return self._parse_text_response(content)
-            
-        except json.JSONDecodeError:
-            logger.warning("Failed to parse JSON response, using text parsing")
-            return self._parse_text_response(content)
+            data = orjson.loads(content)
+        except orjson.JSONDecodeError:
+            try:
+                data = orjson.loads(_repair_json(content))
+                logger.debug("Recovered malformed JSON response via repair")
+            except orjson.JSONDecodeError:
+                logger.warning("Failed to parse JSON response, using text parsing")
+                return self._parse_text_response(content)
+
+        if isinstance(data, list):
+            return data
+        elif isinstance(data, dict) and "suggestions" in data:
+            return data["suggestions"]
+
+        # Fallback to text parsing
+        return self._parse_text_response(content)
 
     def _parse_text_response(self, content: str) -> List[Dict[str, Any]]:
         """Parse text response into structured suggestions"""
         suggestions = []
-        lines = content.split('\n')
-        
+
         current_suggestion = {}
-        for line in lines:
+        for line in content.split('\n'):
             line = line.strip()
             if not line:
                 continue
-                
-            if line.startswith('**Issue:**') or line.startswith('Issue:'):
+
+            match = _FIELD_RE.match(line)
+            if match is None:
+                # Continuation line: add to description
+                if current_suggestion:
+                    if current_suggestion["description"]:
+                        current_suggestion["description"] += " " + line
+                    else:
+                        current_suggestion["description"] = line
+                continue
+
+            field, value = match.groups()
+            if field == "Issue":
                 if current_suggestion:
                     suggestions.append(current_suggestion)
                 current_suggestion = {
                     "type": "issue",
-                    "title": line.replace('**Issue:**', '').replace('Issue:', '').strip(),
+                    "title": value.strip(),
                     "description": "",
                     "severity": "medium"
                 }
-            elif line.startswith('**Severity:**') or line.startswith('Severity:'):
-                severity = line.replace('**Severity:**', '').replace('Severity:', '').strip().lower()
-                if current_suggestion:
-                    current_suggestion["severity"] = severity
-            elif line.startswith('**Description:**') or line.startswith('Description:'):
-                description = line.replace('**Description:**', '').replace('Description:', '').strip()
-                if current_suggestion:
-                    current_suggestion["description"] = description
-            elif current_suggestion and line:
-                # Add to description
-                if current_suggestion["description"]:
-                    current_suggestion["description"] += " " + line
-                else:
-                    current_suggestion["description"] = line
-        
+            elif current_suggestion:
+                key, transform = _FIELD_DISPATCH[field]
+                current_suggestion[key] = transform(value.strip())
+
         if current_suggestion:
             suggestions.append(current_suggestion)
-        
+
         return suggestions
 
     def _add_confidence_scores(self, suggestions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Add confidence scores to suggestions"""
+        if len(suggestions) >= _SCORE_BATCH_THRESHOLD:
+            self._score_batch(suggestions)
+            return suggestions
+
         for suggestion in suggestions:
             # Simple confidence scoring based on suggestion characteristics
             confidence = 0.5  # Base confidence
-            
+
             # Increase confidence for specific patterns
-            if suggestion.get("severity") == "high":
-                confidence += 0.2
-            elif suggestion.get("severity") == "medium":
-                confidence += 0.1
-            
+            confidence += _SEVERITY_BONUS.get(suggestion.get("severity"), 0.0)
+
             if len(suggestion.get("description", "")) > 50:
                 confidence += 0.1
-            
+
             suggestion["confidence"] = min(confidence, 1.0)
-        
+
         return suggestions
 
+    def _score_batch(self, suggestions: List[Dict[str, Any]]) -> None:
+        """Vectorized confidence scoring for large suggestion batches
+
+        Structure-of-arrays version of _add_confidence_scores: the
+        severity bonuses and description lengths go into two NumPy
+        arrays, one clip computes every confidence at once, and the
+        results are written back in a single zip — no per-dict Python
+        arithmetic when thousands of suggestions arrive from the batch
+        analysis path.
+        """
+        count = len(suggestions)
+        severity_bonus = np.fromiter(
+            (_SEVERITY_BONUS.get(s.get("severity"), 0.0) for s in suggestions),
+            dtype=np.float64,
+            count=count
+        )
+        desc_lens = np.fromiter(
+            (len(s.get("description", "")) for s in suggestions),
+            dtype=np.int64,
+            count=count
+        )
+        confidence = np.clip(
+            0.5 + severity_bonus + 0.1 * (desc_lens > 50), 0.0, 1.0
+        )
+        for suggestion, score in zip(suggestions, confidence):
+            suggestion["confidence"] = float(score)
+
+    def _calculate_cost_micro(self, usage: Dict[str, int], provider: str) -> int:
+        """Calculate cost in integer micro-USD"""
+        rates = _PRICE_MICRO.get(provider)
+        if rates is None:
+            return 0
+        input_rate, output_rate = rates
+        return (
+            usage["input_tokens"] * input_rate
+            + usage["output_tokens"] * output_rate
+        )
+
     def _calculate_cost(self, usage: Dict[str, int], provider: str) -> float:
-        """Calculate cost based on usage and provider"""
-        # Simplified cost calculation
-        if provider == "anthropic":
-            # Claude pricing (approximate)
-            input_cost = usage["input_tokens"] * 0.000003
-            output_cost = usage["output_tokens"] * 0.000015
-        elif provider == "openai":
-            # GPT-4 pricing (approximate)
-            input_cost = usage["input_tokens"] * 0.00003
-            output_cost = usage["output_tokens"] * 0.00006
-        else:
-            return 0.0
-        
-        return input_cost + output_cost
+        """Calculate cost in dollars based on usage and provider"""
+        return self._calculate_cost_micro(usage, provider) / 1e6
 
     def get_token_usage(self) -> Dict[str, int]:
         """Get current token usage"""
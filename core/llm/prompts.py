@@ -1,10 +1,12 @@
 """
 Prompt management for Code Review AI
 """
-import json
-from typing import Dict, Any, List
+import types
+from functools import lru_cache
+from typing import Dict, Any, List, Mapping, Optional, Tuple
 from dataclasses import dataclass
 
+import orjson
 import structlog
 from core.config import get_settings
 
@@ -12,6 +14,41 @@ logger = structlog.get_logger(__name__)
 settings = get_settings()
 
 
+@lru_cache(maxsize=256)
+def _format_file_paths(file_paths: Tuple[str, ...]) -> str:
+    """Join file paths into the bulleted list form, once per tuple"""
+    return "\n".join(f"- {path}" for path in file_paths)
+
+
+@lru_cache(maxsize=1024)
+def _format_analysis(
+    template: str,
+    diff_content: str,
+    context: str,
+    file_paths: Tuple[str, ...],
+    repository_url: str
+) -> str:
+    """Fill the analysis template, memoized on its (hashable) inputs
+
+    Repeat analyses of the same PR — retries, re-reviews, the batch
+    path fanning out over identical diffs — re-run an expensive
+    str.format over a multi-KB template with identical arguments. The
+    template text is constant per version, so the formatted result is
+    fully determined by these arguments and safe to cache.
+    """
+    context_section = f"""
+## Context from Repository
+{context}
+""" if context else ""
+
+    return template.format(
+        diff_content=diff_content,
+        context=context_section,
+        file_paths=_format_file_paths(file_paths),
+        repository_url=repository_url
+    )
+
+
 @dataclass
 class PromptTemplate:
     """Prompt template data structure"""
@@ -20,6 +57,8 @@ class PromptTemplate:
     version: str
     variables: List[str]
     description: str
+    # Precomputed at load so per-call validation is an O(1) set check
+    required: frozenset = frozenset()
 
 
 class PromptManager:
@@ -27,11 +66,20 @@ class PromptManager:
     
     def __init__(self):
         self.templates = self._load_templates()
+        # Zero-copy read-only view handed out by get_all_templates;
+        # tracks updates to self.templates automatically
+        self._templates_view = types.MappingProxyType(self.templates)
         self.current_version = "v1.0"
 
     def _load_templates(self) -> Dict[str, PromptTemplate]:
-        """Load prompt templates"""
-        return {
+        """Load prompt templates
+
+        Templates are validated here, once, rather than on every
+        invocation: a template missing one of its declared variables is
+        a deploy-time bug, so it fails at startup instead of costing a
+        substring scan per request.
+        """
+        templates = {
             "analysis": PromptTemplate(
                 name="code_analysis",
                 template=self._get_analysis_template(),
@@ -43,18 +91,31 @@ class PromptManager:
                 name="feedback_learning",
                 template=self._get_feedback_learning_template(),
                 version="v1.0",
-                variables=["feedback_data", "suggestions", "corrections"],
+                variables=["feedback_data", "suggestions"],
                 description="Feedback learning prompt"
             ),
             "pattern_matching": PromptTemplate(
                 name="pattern_matching",
                 template=self._get_pattern_matching_template(),
                 version="v1.0",
-                variables=["code_content", "patterns", "rules"],
+                variables=["code_content", "patterns"],
                 description="Pattern matching prompt"
             )
         }
 
+        for template in templates.values():
+            missing = [
+                variable for variable in template.variables
+                if f"{{{variable}}}" not in template.template
+            ]
+            if missing:
+                raise ValueError(
+                    f"Template '{template.name}' missing variables: {missing}"
+                )
+            template.required = frozenset(template.variables)
+
+        return templates
+
     def get_analysis_prompt(
         self,
         diff_content: str,
@@ -64,26 +125,53 @@ class PromptManager:
     ) -> str:
         """Get code analysis prompt"""
         template = self.templates["analysis"]
-        
-        # Format file paths
-        file_paths_str = "\n".join([f"- {path}" for path in file_paths])
-        
-        # Format context
-        context_section = f"""
-## Context from Repository
-{context}
-""" if context else ""
 
-        prompt = template.template.format(
-            diff_content=diff_content,
-            context=context_section,
-            file_paths=file_paths_str,
-            repository_url=repository_url
+        prompt = _format_analysis(
+            template.template,
+            diff_content,
+            context,
+            tuple(file_paths),
+            repository_url
         )
-        
+
         logger.debug("Generated analysis prompt", template_version=template.version)
         return prompt
 
+    def get_analysis_messages(
+        self,
+        diff_content: str,
+        context: str,
+        file_paths: List[str],
+        repository_url: str
+    ) -> Dict[str, Any]:
+        """Get code analysis prompt split into system blocks and user content
+
+        The instruction half of the analysis template is identical on
+        every call, so it is returned as a separate system block tagged
+        with ``cache_control: ephemeral``. Anthropic then serves those
+        input tokens from its prompt cache instead of re-billing (and
+        re-processing) them per request; only the diff, file list, and
+        retrieved context stay in the volatile user message.
+        """
+        user_content = _format_analysis(
+            self._get_analysis_user_template(),
+            diff_content,
+            context,
+            tuple(file_paths),
+            repository_url
+        )
+
+        return {
+            "system": [
+                {
+                    "type": "text",
+                    "text": self._get_analysis_system_template(),
+                    "cache_control": {"type": "ephemeral"}
+                }
+            ],
+            "user": user_content
+        }
+
     def get_feedback_learning_prompt(
         self,
         feedback_data: List[Dict[str, Any]],
@@ -93,8 +181,8 @@ class PromptManager:
         template = self.templates["feedback_learning"]
         
         # Format feedback data
-        feedback_str = json.dumps(feedback_data, indent=2)
-        suggestions_str = json.dumps(suggestions, indent=2)
+        feedback_str = orjson.dumps(feedback_data, option=orjson.OPT_INDENT_2).decode()
+        suggestions_str = orjson.dumps(suggestions, option=orjson.OPT_INDENT_2).decode()
         
         prompt = template.template.format(
             feedback_data=feedback_str,
@@ -113,7 +201,7 @@ class PromptManager:
         template = self.templates["pattern_matching"]
         
         # Format patterns
-        patterns_str = json.dumps(patterns, indent=2)
+        patterns_str = orjson.dumps(patterns, option=orjson.OPT_INDENT_2).decode()
         
         prompt = template.template.format(
             code_content=code_content,
@@ -125,19 +213,14 @@ class PromptManager:
 
     def _get_analysis_template(self) -> str:
         """Get code analysis prompt template"""
-        return """You are an expert code reviewer analyzing a pull request. Your task is to identify potential issues, improvements, and best practices violations.
+        # Single-prompt form: the cache-stable instruction block followed
+        # by the per-request content. Providers without prompt caching
+        # (and existing single-string callers) use this concatenation.
+        return self._get_analysis_system_template() + "\n\n" + self._get_analysis_user_template()
 
-## Repository Information
-- Repository: {repository_url}
-- Changed Files:
-{file_paths}
-
-## Code Changes
-```diff
-{diff_content}
-```
-
-{context}
+    def _get_analysis_system_template(self) -> str:
+        """Get the static, cacheable half of the analysis prompt"""
+        return """You are an expert code reviewer analyzing a pull request. Your task is to identify potential issues, improvements, and best practices violations.
 
 ## Analysis Instructions
 
@@ -177,6 +260,20 @@ Please analyze the code changes and provide suggestions in the following JSON fo
 
 Analyze the code and provide your suggestions in the specified JSON format."""
 
+    def _get_analysis_user_template(self) -> str:
+        """Get the per-request half of the analysis prompt"""
+        return """## Repository Information
+- Repository: {repository_url}
+- Changed Files:
+{file_paths}
+
+## Code Changes
+```diff
+{diff_content}
+```
+
+{context}"""
+
     def _get_feedback_learning_template(self) -> str:
         """Get feedback learning prompt template"""
         return """You are learning from human feedback to improve code review suggestions. Analyze the feedback data and learn patterns to improve future suggestions.
@@ -223,13 +320,24 @@ Return results in JSON format with pattern matches and confidence scores."""
         """Get prompt template by name"""
         return self.templates.get(name)
 
-    def get_all_templates(self) -> Dict[str, PromptTemplate]:
-        """Get all prompt templates"""
-        return self.templates.copy()
+    def get_all_templates(self) -> Mapping[str, PromptTemplate]:
+        """Get a read-only view of all prompt templates"""
+        return self._templates_view
 
     def update_template(self, name: str, template: PromptTemplate) -> bool:
         """Update prompt template"""
         try:
+            # Validate on the way in so runtime callers never have to
+            missing = [
+                variable for variable in template.variables
+                if f"{{{variable}}}" not in template.template
+            ]
+            if missing:
+                logger.error(
+                    "Template update rejected", name=name, missing=missing
+                )
+                return False
+            template.required = frozenset(template.variables)
             self.templates[name] = template
             logger.info("Template updated", name=name, version=template.version)
             return True
@@ -237,18 +345,13 @@ Return results in JSON format with pattern matches and confidence scores."""
             logger.error("Template update failed", name=name, error=str(e))
             return False
 
-    def validate_template(self, template: str, variables: List[str]) -> bool:
-        """Validate template has all required variables"""
-        try:
-            # Check if all variables are present in template
-            for variable in variables:
-                if f"{{{variable}}}" not in template:
-                    logger.warning("Template missing variable", variable=variable)
-                    return False
-            return True
-        except Exception as e:
-            logger.error("Template validation failed", error=str(e))
+    def validate_template(self, name: str, variables: List[str]) -> bool:
+        """Check a loaded template's precomputed variable set"""
+        template = self.templates.get(name)
+        if template is None:
+            logger.warning("Unknown template", name=name)
             return False
+        return template.required == frozenset(variables)
 
     def get_template_stats(self) -> Dict[str, Any]:
         """Get template usage statistics"""
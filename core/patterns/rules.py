@@ -1,19 +1,247 @@
 """
 Pattern matching rules for Code Review AI
 """
+import os
 import re
 import ast
-from typing import List, Dict, Any, Optional
+import sys
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Iterator, List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 
 import structlog
 
 logger = structlog.get_logger(__name__)
 
+# Diff metadata that must not be scanned as code. Matched spans are
+# blanked with equal-length spaces so every char offset in the buffer
+# still maps to the original diff position.
+_DIFF_HEADER_RE = re.compile(r"^(?:\+\+\+|---|@@|diff|index ).*$", re.MULTILINE)
+_DIFF_MARKER_RE = re.compile(r"^[+-]", re.MULTILINE)
 
-@dataclass
+
+def _blank_diff_metadata(diff_content: str) -> str:
+    """Blank diff headers and +/- markers with equal-length spaces
+
+    Length-preserving substitution keeps every offset in the cleaned
+    text identical to the original diff, so match positions can be
+    mapped straight back to line numbers.
+    """
+    cleaned = _DIFF_HEADER_RE.sub(lambda m: " " * len(m.group()), diff_content)
+    return _DIFF_MARKER_RE.sub(" ", cleaned)
+
+
+def _newline_positions(data) -> List[int]:
+    """Index the positions of every newline in a str or bytes buffer"""
+    needle = "\n" if isinstance(data, str) else b"\n"
+    positions = []
+    pos = data.find(needle)
+    while pos != -1:
+        positions.append(pos)
+        pos = data.find(needle, pos + 1)
+    return positions
+
+
+@lru_cache(maxsize=1)
+def _get_process_pool() -> ProcessPoolExecutor:
+    """Get the shared worker pool for per-file fan-out
+
+    Regex and AST scanning are pure-Python compute, so threads gain
+    nothing under the GIL; a process pool sized to the machine is the
+    unit of parallelism for multi-file reviews.
+    """
+    return ProcessPoolExecutor(max_workers=os.cpu_count())
+
+
+# Below this many files, pool IPC costs more than the scan itself
+_PARALLEL_MIN_FILES = 4
+
+
+def _prepare_scan_buffer(diff_content: str) -> Tuple[bytes, List[int]]:
+    """Build the UTF-8 scan buffer and its newline byte offsets
+
+    A match offset bisected into the newline array recovers the 1-based
+    line number without any per-line Python loop.
+    """
+    data = _blank_diff_metadata(diff_content).encode()
+    return data, _newline_positions(data)
+
+
+# Default rule set, built once at import. Instances copy the dicts
+# (feedback mutates per-instance confidence) but share the compiled
+# patterns below, which only depend on the immutable name/pattern pair.
+_DEFAULT_RULES: Tuple[Dict[str, Any], ...] = (
+    {
+        "name": "null_check_missing",
+        "pattern": r"\.(\w+)\s*=\s*[^=].*[^=]",
+        "message": "Potential null pointer access",
+        "severity": "medium",
+        "suggestion": "Add null check before accessing object properties",
+        "confidence": 0.7
+    },
+    {
+        "name": "hardcoded_password",
+        "pattern": r"password\s*==?\s*['\"][^'\"]+['\"]",
+        "message": "Hardcoded password detected",
+        "severity": "high",
+        "suggestion": "Use environment variables or secure configuration",
+        "confidence": 0.9
+    },
+    {
+        "name": "sql_injection",
+        "pattern": r"execute\s*\(\s*['\"].*\+.*['\"]",
+        "message": "Potential SQL injection vulnerability",
+        "severity": "critical",
+        "suggestion": "Use parameterized queries or prepared statements",
+        "confidence": 0.8
+    },
+    {
+        "name": "long_function",
+        "pattern": r"def\s+\w+\([^)]*\):.*(?:\n.*){50,}",
+        "message": "Function is too long",
+        "severity": "low",
+        "suggestion": "Consider breaking into smaller functions",
+        "confidence": 0.6
+    },
+    {
+        "name": "magic_number",
+        "pattern": r"\b\d{3,}\b",
+        "message": "Magic number detected",
+        "severity": "low",
+        "suggestion": "Use named constants instead of magic numbers",
+        "confidence": 0.5
+    },
+    {
+        "name": "empty_catch",
+        "pattern": r"except\s+.*:\s*\n\s*pass",
+        "message": "Empty catch block",
+        "severity": "medium",
+        "suggestion": "Handle exceptions appropriately or log them",
+        "confidence": 0.8
+    },
+    {
+        "name": "unused_import",
+        "pattern": r"import\s+(\w+).*(?:\n.*){10,}",
+        "message": "Potentially unused import",
+        "severity": "low",
+        "suggestion": "Remove unused imports to clean up code",
+        "confidence": 0.4
+    },
+    {
+        "name": "deep_nesting",
+        "pattern": r"(?:if|for|while|try).*(?:\n\s*){4,}(?:if|for|while|try)",
+        "message": "Deep nesting detected",
+        "severity": "medium",
+        "suggestion": "Consider refactoring to reduce nesting",
+        "confidence": 0.7
+    }
+)
+
+
+def _extract_literal(pattern: str) -> Optional[str]:
+    """Find the longest obligatory plain-text run in a regex pattern
+
+    A static analog of Hyperscan's literal fast path: if a pattern can
+    only match where, say, ``password`` appears, a str ``in`` test
+    (two-way search in C) decides whether running the regex is worth it
+    at all. Only top-level runs count — text inside groups or behind
+    ``*``/``?``/``{`` quantifiers isn't obligatory — and a top-level
+    alternation means nothing is. Returns None when no run is long
+    enough to be selective.
+    """
+    best = ""
+    run = ""
+    depth = 0
+    i = 0
+    n = len(pattern)
+
+    def flush() -> None:
+        nonlocal best, run
+        if len(run) > len(best):
+            best = run
+        run = ""
+
+    while i < n:
+        ch = pattern[i]
+        if ch == "\\":
+            # Escapes are classes or metachars; end the run before them
+            flush()
+            i += 2
+            continue
+        if ch == "[":
+            flush()
+            i += 1
+            # Skip the character class, honoring escapes
+            while i < n and pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+        elif ch == "(":
+            depth += 1
+            flush()
+        elif ch == ")":
+            depth -= 1
+            flush()
+        elif ch == "|":
+            if depth == 0:
+                return None
+        elif ch in "*?{":
+            # Quantifier makes the preceding char optional; drop it
+            run = run[:-1]
+            flush()
+            if ch == "{":
+                while i < n and pattern[i] != "}":
+                    i += 1
+        elif ch in "+.^$":
+            # '+' keeps its atom obligatory; the rest end the run
+            flush()
+        elif depth == 0:
+            run += ch
+        i += 1
+
+    flush()
+    return best if len(best) >= 3 else None
+
+
+def _compile_rule_patterns(rules) -> Dict[str, re.Pattern]:
+    """Compile each rule's pattern for its own pass over the buffer
+
+    Rules are deliberately NOT merged into one alternation: finditer
+    never reports a second alternative inside a span an earlier one
+    consumed, so a greedy multi-line rule (unused_import's trailing
+    ``(?:\\n.*){10,}``, say) would swallow most of the buffer and
+    silently mask every other rule's findings — including the security
+    rules this matcher exists for. Even the single-line rules overlap
+    (a ``.*`` or a quoted string can cover another rule's match on the
+    same line), so only independent per-rule scans report everything.
+
+    Compiled over bytes and without IGNORECASE: per-character case
+    folding disables several of re's literal fast paths, so case
+    insensitivity comes from scanning a bytes.lower() copy of the
+    buffer instead. Rule patterns are lowercase ASCII by convention
+    (see add_custom_rule).
+    """
+    return {rule["name"]: re.compile(rule["pattern"].encode()) for rule in rules}
+
+
+# Obligatory literal per rule, used to drop whole rules from a scan
+# when the buffer can't contain a match
+for _rule in _DEFAULT_RULES:
+    _rule["literal"] = _extract_literal(_rule["pattern"])
+
+
+# Compiled once at import and handed to every instance whose rule set
+# still matches the defaults
+_DEFAULT_PATTERNS = _compile_rule_patterns(_DEFAULT_RULES)
+
+
+@dataclass(slots=True)
 class PatternMatch:
-    """Pattern match result"""
+    """Pattern match result
+
+    slots: large reviews produce thousands of these, and dropping the
+    per-instance __dict__ roughly halves their footprint.
+    """
     rule_name: str
     severity: str
     message: str
@@ -29,75 +257,40 @@ class PatternMatcher:
     def __init__(self):
         self.rules = self._load_default_rules()
         self.rule_stats = {}
+        # The default rule set reuses the patterns compiled at import
+        # instead of recompiling per instance — servers that build one
+        # matcher per request paid that compile on every request
+        self._rules_by_name = {rule["name"]: rule for rule in self.rules}
+        self._patterns: Dict[str, re.Pattern] = _DEFAULT_PATTERNS
+
+    def _rebuild_patterns(self) -> None:
+        """Recompile the per-rule patterns after a rule-set change"""
+        self._rules_by_name = {rule["name"]: rule for rule in self.rules}
+        self._patterns = _compile_rule_patterns(self.rules)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """Pickle only the rule list, not the compiled artifacts
+
+        Shipping a compiled re.Pattern per task is wasted bytes; pool
+        workers rebuild them from the rules on first use.
+        """
+        state = self.__dict__.copy()
+        state["_patterns"] = {}
+        state["_rules_by_name"] = {}
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._rebuild_patterns()
 
     def _load_default_rules(self) -> List[Dict[str, Any]]:
-        """Load default pattern rules"""
-        return [
-            {
-                "name": "null_check_missing",
-                "pattern": r"\.(\w+)\s*=\s*[^=].*[^=]",
-                "message": "Potential null pointer access",
-                "severity": "medium",
-                "suggestion": "Add null check before accessing object properties",
-                "confidence": 0.7
-            },
-            {
-                "name": "hardcoded_password",
-                "pattern": r"password\s*=\s*['\"][^'\"]+['\"]",
-                "message": "Hardcoded password detected",
-                "severity": "high",
-                "suggestion": "Use environment variables or secure configuration",
-                "confidence": 0.9
-            },
-            {
-                "name": "sql_injection",
-                "pattern": r"execute\s*\(\s*['\"].*\+.*['\"]",
-                "message": "Potential SQL injection vulnerability",
-                "severity": "critical",
-                "suggestion": "Use parameterized queries or prepared statements",
-                "confidence": 0.8
-            },
-            {
-                "name": "long_function",
-                "pattern": r"def\s+\w+\([^)]*\):.*(?:\n.*){50,}",
-                "message": "Function is too long",
-                "severity": "low",
-                "suggestion": "Consider breaking into smaller functions",
-                "confidence": 0.6
-            },
-            {
-                "name": "magic_number",
-                "pattern": r"\b\d{3,}\b",
-                "message": "Magic number detected",
-                "severity": "low",
-                "suggestion": "Use named constants instead of magic numbers",
-                "confidence": 0.5
-            },
-            {
-                "name": "empty_catch",
-                "pattern": r"except\s+.*:\s*\n\s*pass",
-                "message": "Empty catch block",
-                "severity": "medium",
-                "suggestion": "Handle exceptions appropriately or log them",
-                "confidence": 0.8
-            },
-            {
-                "name": "unused_import",
-                "pattern": r"import\s+(\w+).*(?:\n.*){10,}",
-                "message": "Potentially unused import",
-                "severity": "low",
-                "suggestion": "Remove unused imports to clean up code",
-                "confidence": 0.4
-            },
-            {
-                "name": "deep_nesting",
-                "pattern": r"(?:if|for|while|try).*(?:\n\s*){4,}(?:if|for|while|try)",
-                "message": "Deep nesting detected",
-                "severity": "medium",
-                "suggestion": "Consider refactoring to reduce nesting",
-                "confidence": 0.7
-            }
-        ]
+        """Load default pattern rules
+
+        Shallow-copies each rule dict: feedback and optimization adjust
+        confidence per instance, which must not bleed into the shared
+        _DEFAULT_RULES entries.
+        """
+        return [dict(rule) for rule in _DEFAULT_RULES]
 
     def analyze_code(
         self,
@@ -109,43 +302,94 @@ class PatternMatcher:
         """
         try:
             logger.debug("Starting pattern analysis", file_count=len(file_paths))
-            
-            matches = []
-            lines = diff_content.split('\n')
-            
-            for line_num, line in enumerate(lines, 1):
-                # Skip diff headers
-                if line.startswith(('+++', '---', '@@', 'diff')):
-                    continue
-                
-                # Skip added/removed line markers
-                if line.startswith(('+', '-')):
-                    line = line[1:]  # Remove diff marker
-                
-                # Apply each rule
-                for rule in self.rules:
-                    if re.search(rule["pattern"], line, re.IGNORECASE):
-                        match = PatternMatch(
-                            rule_name=rule["name"],
-                            severity=rule["severity"],
-                            message=rule["message"],
-                            line_number=line_num,
-                            file_path=file_paths[0] if file_paths else "unknown",
-                            suggestion=rule["suggestion"],
-                            confidence=rule["confidence"]
-                        )
-                        matches.append(match)
-                        
-                        # Update rule statistics
-                        self._update_rule_stats(rule["name"], True)
-            
+
+            matches = list(self.iter_matches(diff_content, file_paths))
+
             logger.debug("Pattern analysis completed", matches_count=len(matches))
             return matches
-            
+
         except Exception as e:
             logger.error("Pattern analysis failed", error=str(e))
             return []
 
+    def iter_matches(
+        self,
+        diff_content: str,
+        file_paths: List[str]
+    ) -> Iterator[PatternMatch]:
+        """Stream pattern matches as the scan produces them
+
+        Generator form keeps peak memory at one live match and lets
+        consumers pipeline results into downstream stages; analyze_code
+        wraps it for callers that want the full list.
+        """
+        if not self.rules:
+            return
+
+        # One finditer per rule over the whole diff instead of
+        # re-entering the regex engine per line; metadata is blanked
+        # offset-preservingly and line numbers come from bisecting
+        # match positions into the newline index. bytes.lower() is
+        # ASCII-only and length-preserving, so offsets stay valid
+        # and the patterns skip IGNORECASE folding entirely.
+        data, newline_pos = _prepare_scan_buffer(diff_content)
+        lower = data.lower()
+        # Interned once here, shared by reference across every
+        # match this call produces
+        file_path = sys.intern(file_paths[0]) if file_paths else "unknown"
+
+        for rule in self.rules:
+            # A rule whose obligatory literal is absent can't match;
+            # the C-level substring test skips its whole pass, so a
+            # typical diff only pays for the few rules it could
+            # actually trip
+            literal = rule.get("literal")
+            if literal and literal.encode() not in lower:
+                continue
+
+            for found in self._patterns[rule["name"]].finditer(lower):
+                # Update rule statistics
+                self._update_rule_stats(rule["name"], True)
+
+                yield PatternMatch(
+                    rule_name=rule["name"],
+                    severity=rule["severity"],
+                    message=rule["message"],
+                    line_number=bisect_right(newline_pos, found.start()) + 1,
+                    file_path=file_path,
+                    suggestion=rule["suggestion"],
+                    confidence=rule["confidence"]
+                )
+
+    def analyze_files(self, diff_by_file: Dict[str, str]) -> List[PatternMatch]:
+        """Analyze per-file diffs, fanning large reviews across processes
+
+        The scan is data-parallel across files, so reviews touching
+        enough of them map over the shared process pool; each worker
+        unpickles the rule list and compiles its own rule set. Results
+        come back in input order. Small reviews stay serial, and any
+        pool failure falls back to the serial path.
+        """
+        items = list(diff_by_file.items())
+
+        if len(items) >= _PARALLEL_MIN_FILES:
+            try:
+                results = _get_process_pool().map(
+                    self.analyze_code,
+                    [content for _, content in items],
+                    [[path] for path, _ in items]
+                )
+                return [match for file_matches in results for match in file_matches]
+            except Exception as e:
+                logger.warning(
+                    "Process-pool analysis failed, running serially", error=str(e)
+                )
+
+        matches: List[PatternMatch] = []
+        for path, content in items:
+            matches.extend(self.analyze_code(content, [path]))
+        return matches
+
     def _update_rule_stats(self, rule_name: str, matched: bool):
         """Update rule statistics"""
         if rule_name not in self.rule_stats:
@@ -164,21 +408,30 @@ class PatternMatcher:
         suggestion: str,
         confidence: float = 0.5
     ) -> bool:
-        """Add custom pattern rule"""
+        """Add custom pattern rule
+
+        Matching runs over a lowercased buffer, so patterns should be
+        written in lowercase ASCII (or scope folding locally with
+        ``(?i:...)``); an uppercase literal would never match.
+        """
         try:
-            # Validate pattern
-            re.compile(pattern)
-            
+            # Compiling inside a named group also rejects rule names
+            # that aren't identifiers
+            sanitized = re.sub(r"\(\?P<\w+>", "(?:", pattern)
+            re.compile(f"(?P<{name}>{sanitized})".encode())
+
             rule = {
                 "name": name,
                 "pattern": pattern,
                 "message": message,
                 "severity": severity,
                 "suggestion": suggestion,
-                "confidence": confidence
+                "confidence": confidence,
+                "literal": _extract_literal(pattern)
             }
             
             self.rules.append(rule)
+            self._rebuild_patterns()
             logger.info("Custom rule added", rule_name=name)
             return True
             
@@ -193,6 +446,7 @@ class PatternMatcher:
         """Remove pattern rule"""
         try:
             self.rules = [rule for rule in self.rules if rule["name"] != rule_name]
+            self._rebuild_patterns()
             logger.info("Rule removed", rule_name=rule_name)
             return True
         except Exception as e:
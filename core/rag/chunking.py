@@ -3,17 +3,306 @@ Code chunking for RAG system
 """
 import hashlib
 import ast
-from typing import List, Dict, Any, Optional, Tuple
+import os
+import re
+import sys
+from bisect import bisect_right
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Iterator, List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 
 import structlog
 
+try:
+    # Optional: C incremental parser for the JS/TS chunker; the
+    # regex+brace fallback below misparses strings, comments, and regex
+    # literals that contain braces
+    from tree_sitter_languages import get_parser as _get_ts_language_parser
+except ImportError:
+    _get_ts_language_parser = None
+
+try:
+    # Optional: JIT-compiled byte scanner for generic-language
+    # complexity; the compiled-regex pass below is the fallback
+    import numpy as np
+    from numba import njit
+except ImportError:
+    njit = None
+
 logger = structlog.get_logger(__name__)
 
 
-@dataclass
+if njit is not None:
+
+    @njit(cache=True)
+    def _is_word_byte(b: int) -> bool:
+        # \w for our purposes; bytes >= 0x80 are inside multi-byte UTF-8
+        # letters, so treating them as word chars mirrors re's \b
+        return (
+            48 <= b <= 57
+            or 65 <= b <= 90
+            or 97 <= b <= 122
+            or b == 95
+            or b >= 128
+        )
+
+    @njit(cache=True)
+    def _scan_branch_tokens(buf) -> int:
+        """Count if/while/for/switch/case, && and || in one byte pass"""
+        n = buf.shape[0]
+        count = 0
+        i = 0
+        while i < n:
+            c = buf[i]
+            if c == 38 or c == 124:  # '&' / '|'
+                if i + 1 < n and buf[i + 1] == c:
+                    count += 1
+                    i += 2
+                    continue
+            elif 97 <= c <= 122 and (i == 0 or not _is_word_byte(buf[i - 1])):
+                length = 0
+                if c == 105:  # if
+                    if i + 1 < n and buf[i + 1] == 102:
+                        length = 2
+                elif c == 102:  # for
+                    if i + 2 < n and buf[i + 1] == 111 and buf[i + 2] == 114:
+                        length = 3
+                elif c == 119:  # while
+                    if (
+                        i + 4 < n
+                        and buf[i + 1] == 104
+                        and buf[i + 2] == 105
+                        and buf[i + 3] == 108
+                        and buf[i + 4] == 101
+                    ):
+                        length = 5
+                elif c == 115:  # switch
+                    if (
+                        i + 5 < n
+                        and buf[i + 1] == 119
+                        and buf[i + 2] == 105
+                        and buf[i + 3] == 116
+                        and buf[i + 4] == 99
+                        and buf[i + 5] == 104
+                    ):
+                        length = 6
+                elif c == 99:  # case
+                    if (
+                        i + 3 < n
+                        and buf[i + 1] == 97
+                        and buf[i + 2] == 115
+                        and buf[i + 3] == 101
+                    ):
+                        length = 4
+                if length:
+                    end = i + length
+                    if end == n or not _is_word_byte(buf[end]):
+                        count += 1
+                        i = end
+                        continue
+            i += 1
+        return count
+
+    try:
+        # Warm the JIT at import so the first chunked file doesn't pay
+        # the compile; cache=True persists it across processes
+        _scan_branch_tokens(np.frombuffer(b"if (a && b)", dtype=np.uint8))
+    except Exception:  # pragma: no cover - compilation environment issue
+        _scan_branch_tokens = None
+else:
+    _scan_branch_tokens = None
+
+
+@lru_cache(maxsize=1)
+def _get_process_pool() -> ProcessPoolExecutor:
+    """Get the shared worker pool for per-file chunking fan-out
+
+    AST and tree-sitter chunking are GIL-bound compute, so multi-file
+    jobs map over processes; workers rebuild their own parsers lazily.
+    """
+    return ProcessPoolExecutor(max_workers=os.cpu_count())
+
+
+# Below this many files, pool IPC costs more than the chunking itself
+_PARALLEL_MIN_FILES = 4
+
+
+def _line_offsets(content: str) -> List[int]:
+    """Index the start offset of every line in the source
+
+    An int array replaces the materialized list from split('\\n') — for
+    a multi-MB file that's one small buffer instead of hundreds of
+    thousands of live str objects. Counts lines the way split does,
+    including the empty line after a trailing newline.
+    """
+    offsets = [0]
+    pos = content.find('\n')
+    while pos != -1:
+        offsets.append(pos + 1)
+        pos = content.find('\n', pos + 1)
+    return offsets
+
+
+def _line_span(content: str, offsets: List[int], start: int, end: int) -> Tuple[int, int]:
+    """Offsets of the span covering lines [start, end)"""
+    begin = offsets[start]
+    stop = offsets[end] - 1 if end < len(offsets) else len(content)
+    return begin, stop
+
+
+def _slice_lines(content: str, offsets: List[int], start: int, end: int) -> str:
+    """Slice lines [start, end) straight out of the source
+
+    Equivalent to '\\n'.join(content.split('\\n')[start:end]) with one
+    substring copy and no intermediate list.
+    """
+    begin, stop = _line_span(content, offsets, start, end)
+    return content[begin:stop]
+
+
+def _hash_bytes(data) -> str:
+    """Fingerprint a bytes-like span for identity, not cryptography
+
+    blake2b is the fastest hash in hashlib and measurably cheaper than
+    SHA-256 on large chunks; digest_size=32 keeps the 64-hex-char shape
+    the code_hash column expects. Accepts memoryviews so callers can
+    hash straight out of a shared buffer without copying.
+    """
+    return hashlib.blake2b(data, digest_size=32).hexdigest()
+
+
+def _hash_content(content: str) -> str:
+    """Fingerprint str chunk content (see _hash_bytes)"""
+    return _hash_bytes(content.encode())
+
+
+@lru_cache(maxsize=1)
+def _get_hash_pool() -> ThreadPoolExecutor:
+    """Thread pool for batch hashing
+
+    hashlib releases the GIL for updates beyond ~2 KiB, so hashing many
+    sizable spans genuinely runs in parallel on threads — no process
+    overhead needed.
+    """
+    return ThreadPoolExecutor(
+        max_workers=min(4, os.cpu_count() or 1),
+        thread_name_prefix="chunk-hash"
+    )
+
+
+# Threading only pays once there's this much to hash in one batch;
+# below it, pool dispatch costs more than the hashing
+_BATCH_HASH_MIN_BYTES = 1 << 20
+
+
+def _hash_spans(code_bytes: bytes, spans: List[Tuple[int, int]]) -> List[str]:
+    """Hash many spans of a shared buffer in one batch
+
+    Each span hashes zero-copy through a memoryview; batches worth the
+    dispatch overhead fan out across the hash pool instead of
+    serializing into blake2b one call at a time.
+    """
+    views = [memoryview(code_bytes)[begin:stop] for begin, stop in spans]
+    total = sum(stop - begin for begin, stop in spans)
+    if total >= _BATCH_HASH_MIN_BYTES:
+        return list(_get_hash_pool().map(_hash_bytes, views))
+    return [_hash_bytes(view) for view in views]
+
+
+def _ascii_bytes(content: str) -> Optional[bytes]:
+    """Encode the source once if its byte offsets match char offsets
+
+    Pure-ASCII files (the overwhelmingly common case) encode to the
+    same length, so line offsets computed on the str index straight
+    into the bytes and chunk hashing can slice this buffer zero-copy.
+    Returns None for non-ASCII sources, where callers re-encode per
+    chunk as before.
+    """
+    encoded = content.encode()
+    return encoded if len(encoded) == len(content) else None
+
+
+# Branch weight per concrete AST node type. A dict lookup on
+# type(child) replaces the isinstance-against-tuple chain in the
+# complexity fallback — markedly cheaper per node in a walk that
+# touches every descendant.
+_COMPLEXITY_WEIGHTS = {
+    ast.If: 1,
+    ast.While: 1,
+    ast.For: 1,
+    ast.AsyncFor: 1,
+    ast.ExceptHandler: 1
+}
+
+
+class _PythonChunkVisitor(ast.NodeVisitor):
+    """Single-pass collector of chunkable nodes and their complexity
+
+    The old flow walked the whole tree to find functions and classes,
+    then re-walked each subtree in _calculate_complexity — O(N) per
+    node, quadratic on deeply nested files. This visitor keeps a stack
+    of the enclosing function/class nodes and credits each control-flow
+    construct to every ancestor as it passes, so one traversal yields
+    both the chunk nodes (in source order) and their raw complexity.
+    """
+
+    def __init__(self):
+        self.nodes: List[ast.AST] = []
+        self.complexity: Dict[int, int] = {}
+        self._stack: List[int] = []
+
+    def _enter(self, node: ast.AST) -> None:
+        self.nodes.append(node)
+        key = id(node)
+        self.complexity[key] = 1
+        self._stack.append(key)
+        self.generic_visit(node)
+        self._stack.pop()
+
+    def _bump(self, amount: int) -> None:
+        for key in self._stack:
+            self.complexity[key] += amount
+
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> None:
+        self._enter(node)
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        self._enter(node)
+
+    def visit_If(self, node: ast.If) -> None:
+        self._bump(1)
+        self.generic_visit(node)
+
+    def visit_While(self, node: ast.While) -> None:
+        self._bump(1)
+        self.generic_visit(node)
+
+    def visit_For(self, node: ast.For) -> None:
+        self._bump(1)
+        self.generic_visit(node)
+
+    def visit_AsyncFor(self, node: ast.AsyncFor) -> None:
+        self._bump(1)
+        self.generic_visit(node)
+
+    def visit_ExceptHandler(self, node: ast.ExceptHandler) -> None:
+        self._bump(1)
+        self.generic_visit(node)
+
+    def visit_BoolOp(self, node: ast.BoolOp) -> None:
+        self._bump(len(node.values) - 1)
+        self.generic_visit(node)
+
+
+@dataclass(slots=True)
 class CodeChunk:
-    """Code chunk data structure"""
+    """Code chunk data structure
+
+    slots: chunking a large PR yields thousands of these, and dropping
+    the per-instance __dict__ roughly halves their footprint.
+    """
     content: str
     file_path: str
     function_name: Optional[str]
@@ -27,37 +316,122 @@ class CodeChunk:
 
 class CodeChunker:
     """Chunk code into meaningful segments for embedding"""
-    
+
+    # One alternation per language family: findall traverses the chunk
+    # once inside the C re engine instead of one full str.count scan per
+    # keyword, and \b fixes the old 'if ' miss on 'if(' spellings
+    _JS_COMPLEXITY_RE = re.compile(
+        r"\b(?:if|while|for|switch|case|catch|finally)\b|&&|\|\|"
+    )
+    _GENERIC_COMPLEXITY_RE = re.compile(
+        r"\b(?:if|while|for|switch|case)\b|&&|\|\|"
+    )
+
+    # Bound on the dedupe seen-set; roughly a large monorepo's worth of
+    # distinct function bodies
+    _DEDUPE_CACHE_SIZE = 50_000
+
     def __init__(self):
         self.max_chunk_size = 200  # tokens
         self.overlap_size = 50     # tokens
         self.supported_languages = ["python", "javascript", "typescript", "java", "go", "rust"]
+        # Content hashes already emitted by this chunker, in LRU order;
+        # consulted only when callers opt into dedupe
+        self._seen_hashes: "OrderedDict[str, None]" = OrderedDict()
 
-    def chunk_code(self, code_content: str, file_path: str) -> List[CodeChunk]:
+    def chunk_code(self, code_content: str, file_path: str, dedupe: bool = False) -> List[CodeChunk]:
         """
         Chunk code content into meaningful segments
         """
         try:
             logger.debug("Chunking code", file_path=file_path, content_length=len(code_content))
-            
-            # Detect language from file extension
-            language = self._detect_language(file_path)
-            
-            # Parse code based on language
-            if language == "python":
-                chunks = self._chunk_python_code(code_content, file_path, language)
-            elif language in ["javascript", "typescript"]:
-                chunks = self._chunk_js_code(code_content, file_path, language)
-            else:
-                chunks = self._chunk_generic_code(code_content, file_path, language)
-            
+
+            chunks = list(self.iter_chunks(code_content, file_path, dedupe=dedupe))
+
             logger.debug("Code chunking completed", chunks_count=len(chunks))
             return chunks
-            
+
         except Exception as e:
             logger.error("Code chunking failed", file_path=file_path, error=str(e))
             return []
 
+    def iter_chunks(self, code_content: str, file_path: str, dedupe: bool = False) -> Iterator[CodeChunk]:
+        """Stream chunks as they are produced
+
+        Generator form keeps peak memory at one live chunk and lets
+        consumers overlap downstream work (embedding, persistence) with
+        parsing; chunk_code wraps it for callers that want the full
+        list.
+
+        With dedupe=True, chunks whose content hash was already emitted
+        by this chunker are dropped — copy-pasted or unchanged function
+        bodies then skip downstream embedding entirely.
+        """
+        # Interned once here, shared by reference across every
+        # chunk this call produces
+        file_path = sys.intern(file_path)
+
+        # Detect language from file extension
+        language = self._detect_language(file_path)
+
+        # Parse code based on language
+        if language == "python":
+            chunks = self._iter_python_chunks(code_content, file_path, language)
+        elif language in ["javascript", "typescript"]:
+            chunks = self._iter_js_chunks(code_content, file_path, language)
+        else:
+            chunks = self._iter_generic_chunks(code_content, file_path, language)
+
+        if dedupe:
+            chunks = (
+                chunk for chunk in chunks if self._first_sighting(chunk.hash)
+            )
+        yield from chunks
+
+    def _first_sighting(self, content_hash: str) -> bool:
+        """Record a hash in the bounded seen-set; False when repeated
+
+        Plays the LRU by hand on an OrderedDict: repeats refresh their
+        recency and the oldest entry falls out past the size bound.
+        """
+        seen = self._seen_hashes
+        if content_hash in seen:
+            seen.move_to_end(content_hash)
+            return False
+        seen[content_hash] = None
+        if len(seen) > self._DEDUPE_CACHE_SIZE:
+            seen.popitem(last=False)
+        return True
+
+    def chunk_files(self, content_by_file: Dict[str, str]) -> List[CodeChunk]:
+        """Chunk several files, fanning large jobs across processes
+
+        Chunking is independent per file, so jobs covering enough files
+        map over the shared process pool; parsers are module/class
+        state and get rebuilt lazily inside each worker. Results come
+        back in input order. Small jobs stay serial, and any pool
+        failure falls back to the serial path.
+        """
+        items = list(content_by_file.items())
+
+        if len(items) >= _PARALLEL_MIN_FILES:
+            try:
+                results = _get_process_pool().map(
+                    self.chunk_code,
+                    [content for _, content in items],
+                    [path for path, _ in items]
+                )
+                return [chunk for file_chunks in results for chunk in file_chunks]
+            except Exception as e:
+                logger.warning(
+                    "Process-pool chunking failed, running serially", error=str(e)
+                )
+
+        chunks: List[CodeChunk] = []
+        for path, content in items:
+            chunks.extend(self.chunk_code(content, path))
+        return chunks
+
     def _detect_language(self, file_path: str) -> str:
         """Detect programming language from file path"""
         extension_map = {
@@ -77,52 +451,93 @@ class CodeChunker:
         
         return "unknown"
 
-    def _chunk_python_code(self, code_content: str, file_path: str, language: str) -> List[CodeChunk]:
+    def _iter_python_chunks(self, code_content: str, file_path: str, language: str) -> Iterator[CodeChunk]:
         """Chunk Python code using AST parsing"""
         try:
-            # Parse Python code
+            # Parse Python code; one visitor pass collects the chunk
+            # nodes and their complexity together
             tree = ast.parse(code_content)
-            chunks = []
-            
-            for node in ast.walk(tree):
-                if isinstance(node, ast.FunctionDef):
-                    chunk = self._create_function_chunk(node, code_content, file_path, language)
-                    if chunk:
-                        chunks.append(chunk)
-                elif isinstance(node, ast.ClassDef):
-                    chunk = self._create_class_chunk(node, code_content, file_path, language)
-                    if chunk:
-                        chunks.append(chunk)
-            
-            # If no functions/classes found, create generic chunks
-            if not chunks:
-                chunks = self._chunk_generic_code(code_content, file_path, language)
-            
-            return chunks
-            
         except SyntaxError as e:
             logger.warning("Python syntax error", file_path=file_path, error=str(e))
-            return self._chunk_generic_code(code_content, file_path, language)
+            yield from self._iter_generic_chunks(code_content, file_path, language)
+            return
+
+        visitor = _PythonChunkVisitor()
+        visitor.visit(tree)
+
+        # Index line starts once; every chunk creator slices its
+        # span straight out of the source instead of joining a
+        # materialized line list. The one-time encode lets chunk
+        # hashing run zero-copy over a shared buffer — class chunks
+        # overlap their methods, so per-chunk encodes pay twice.
+        offsets = _line_offsets(code_content)
+        code_bytes = _ascii_bytes(code_content)
+        produced = False
+
+        # Spans are known before any chunk is built, so all hashes go
+        # through one batch call instead of N separate ones
+        hashes: List[Optional[str]] = [None] * len(visitor.nodes)
+        if code_bytes is not None and visitor.nodes:
+            spans = [
+                _line_span(code_content, offsets, node.lineno - 1, node.end_lineno)
+                for node in visitor.nodes
+            ]
+            hashes = _hash_spans(code_bytes, spans)
+
+        for node, content_hash in zip(visitor.nodes, hashes):
+            complexity = min(visitor.complexity[id(node)] / 10.0, 1.0)
+            if isinstance(node, ast.FunctionDef):
+                chunk = self._create_function_chunk(
+                    node, code_content, offsets, file_path, language,
+                    complexity=complexity, code_bytes=code_bytes,
+                    content_hash=content_hash
+                )
+            elif isinstance(node, ast.ClassDef):
+                chunk = self._create_class_chunk(
+                    node, code_content, offsets, file_path, language,
+                    complexity=complexity, code_bytes=code_bytes,
+                    content_hash=content_hash
+                )
+            else:
+                chunk = None
+            if chunk:
+                produced = True
+                yield chunk
+
+        # If no functions/classes found, create generic chunks
+        if not produced:
+            yield from self._iter_generic_chunks(code_content, file_path, language)
 
     def _create_function_chunk(
-        self, 
-        node: ast.FunctionDef, 
-        code_content: str, 
-        file_path: str, 
-        language: str
+        self,
+        node: ast.FunctionDef,
+        code_content: str,
+        offsets: List[int],
+        file_path: str,
+        language: str,
+        complexity: Optional[float] = None,
+        code_bytes: Optional[bytes] = None,
+        content_hash: Optional[str] = None
     ) -> Optional[CodeChunk]:
         """Create chunk for Python function"""
         try:
-            # Get function source code
-            lines = code_content.split('\n')
-            function_lines = lines[node.lineno-1:node.end_lineno]
-            function_content = '\n'.join(function_lines)
-            
-            # Calculate complexity
-            complexity = self._calculate_complexity(node)
-            
-            # Create hash
-            content_hash = hashlib.sha256(function_content.encode()).hexdigest()
+            # Slice the function's span out of the shared source
+            begin, stop = _line_span(
+                code_content, offsets, node.lineno - 1, node.end_lineno
+            )
+            function_content = code_content[begin:stop]
+
+            # Calculate complexity unless the chunking pass already did
+            if complexity is None:
+                complexity = self._calculate_complexity(node)
+
+            # Hash unless batch-hashed already; zero-copy from the
+            # shared buffer when offsets align
+            if content_hash is None:
+                if code_bytes is not None:
+                    content_hash = _hash_bytes(memoryview(code_bytes)[begin:stop])
+                else:
+                    content_hash = _hash_content(function_content)
             
             return CodeChunk(
                 content=function_content,
@@ -141,24 +556,35 @@ class CodeChunker:
             return None
 
     def _create_class_chunk(
-        self, 
-        node: ast.ClassDef, 
-        code_content: str, 
-        file_path: str, 
-        language: str
+        self,
+        node: ast.ClassDef,
+        code_content: str,
+        offsets: List[int],
+        file_path: str,
+        language: str,
+        complexity: Optional[float] = None,
+        code_bytes: Optional[bytes] = None,
+        content_hash: Optional[str] = None
     ) -> Optional[CodeChunk]:
         """Create chunk for Python class"""
         try:
-            # Get class source code
-            lines = code_content.split('\n')
-            class_lines = lines[node.lineno-1:node.end_lineno]
-            class_content = '\n'.join(class_lines)
-            
-            # Calculate complexity
-            complexity = self._calculate_complexity(node)
-            
-            # Create hash
-            content_hash = hashlib.sha256(class_content.encode()).hexdigest()
+            # Slice the class's span out of the shared source
+            begin, stop = _line_span(
+                code_content, offsets, node.lineno - 1, node.end_lineno
+            )
+            class_content = code_content[begin:stop]
+
+            # Calculate complexity unless the chunking pass already did
+            if complexity is None:
+                complexity = self._calculate_complexity(node)
+
+            # Hash unless batch-hashed already; zero-copy from the
+            # shared buffer when offsets align
+            if content_hash is None:
+                if code_bytes is not None:
+                    content_hash = _hash_bytes(memoryview(code_bytes)[begin:stop])
+                else:
+                    content_hash = _hash_content(class_content)
             
             return CodeChunk(
                 content=class_content,
@@ -176,95 +602,175 @@ class CodeChunker:
             logger.warning("Failed to create class chunk", class_name=node.name, error=str(e))
             return None
 
-    def _chunk_js_code(self, code_content: str, file_path: str, language: str) -> List[CodeChunk]:
+    # tree-sitter parsers built once per language and shared by every
+    # CodeChunker instance; None marks a failed build
+    _ts_parsers: Dict[str, Any] = {}
+
+    # tree-sitter node types that become chunks
+    _TS_CHUNK_TYPES = frozenset(
+        ["function_declaration", "method_definition", "class_declaration"]
+    )
+
+    @classmethod
+    def _get_ts_parser(cls, language: str):
+        """Get (and cache) the tree-sitter parser for a language"""
+        if _get_ts_language_parser is None:
+            return None
+        if language not in cls._ts_parsers:
+            try:
+                cls._ts_parsers[language] = _get_ts_language_parser(language)
+            except Exception as e:
+                logger.warning(
+                    "tree-sitter parser unavailable", language=language, error=str(e)
+                )
+                cls._ts_parsers[language] = None
+        return cls._ts_parsers[language]
+
+    def _iter_js_chunks(self, code_content: str, file_path: str, language: str) -> Iterator[CodeChunk]:
         """Chunk JavaScript/TypeScript code"""
-        # Simple regex-based chunking for JS/TS
-        import re
-        
-        chunks = []
-        lines = code_content.split('\n')
-        
-        # Find function patterns
-        function_pattern = r'^(export\s+)?(async\s+)?function\s+(\w+)'
-        class_pattern = r'^(export\s+)?class\s+(\w+)'
-        
-        current_chunk = []
-        current_function = None
-        current_class = None
-        brace_count = 0
-        start_line = 0
-        
-        for i, line in enumerate(lines):
-            line_num = i + 1
-            
-            # Check for function start
-            func_match = re.match(function_pattern, line.strip())
-            if func_match and brace_count == 0:
-                # Save previous chunk if exists
-                if current_chunk and current_function:
-                    chunk = self._create_js_chunk(
-                        current_chunk, file_path, current_function, 
-                        current_class, start_line, line_num-1, language
-                    )
-                    if chunk:
-                        chunks.append(chunk)
-                
-                # Start new function chunk
-                current_chunk = [line]
-                current_function = func_match.group(3)
-                current_class = None
-                start_line = line_num
-                brace_count = line.count('{') - line.count('}')
-            
-            # Check for class start
-            elif re.match(class_pattern, line.strip()) and brace_count == 0:
-                # Save previous chunk if exists
-                if current_chunk and current_function:
-                    chunk = self._create_js_chunk(
-                        current_chunk, file_path, current_function,
-                        current_class, start_line, line_num-1, language
-                    )
-                    if chunk:
-                        chunks.append(chunk)
-                
-                # Start new class chunk
-                current_chunk = [line]
-                current_function = None
-                current_class = re.match(class_pattern, line.strip()).group(2)
-                start_line = line_num
-                brace_count = line.count('{') - line.count('}')
-            
-            else:
-                current_chunk.append(line)
-                brace_count += line.count('{') - line.count('}')
-                
-                # End of function/class
-                if brace_count == 0 and current_chunk:
-                    chunk = self._create_js_chunk(
-                        current_chunk, file_path, current_function,
-                        current_class, start_line, line_num, language
+        parser = self._get_ts_parser(language)
+        if parser is None:
+            yield from self._chunk_js_code_regex(code_content, file_path, language)
+            return
+
+        code_bytes = code_content.encode()
+        tree = parser.parse(code_bytes)
+
+        def walk(node, enclosing_class: Optional[str]) -> Iterator[CodeChunk]:
+            for child in node.children:
+                child_class = enclosing_class
+                if child.type in self._TS_CHUNK_TYPES:
+                    name_node = child.child_by_field_name("name")
+                    name = name_node.text.decode() if name_node else None
+                    content_bytes = code_bytes[child.start_byte:child.end_byte]
+                    is_class = child.type == "class_declaration"
+                    chunk = self._create_ts_chunk(
+                        content_bytes=content_bytes,
+                        file_path=file_path,
+                        function_name=None if is_class else name,
+                        class_name=name if is_class else enclosing_class,
+                        line_start=child.start_point[0] + 1,
+                        line_end=child.end_point[0] + 1,
+                        language=language
                     )
                     if chunk:
-                        chunks.append(chunk)
-                    current_chunk = []
-                    current_function = None
-                    current_class = None
-        
-        # Handle remaining chunk
-        if current_chunk and current_function:
+                        yield chunk
+                    if is_class:
+                        child_class = name
+                yield from walk(child, child_class)
+
+        yield from walk(tree.root_node, None)
+
+    def _create_ts_chunk(
+        self,
+        content_bytes: bytes,
+        file_path: str,
+        function_name: Optional[str],
+        class_name: Optional[str],
+        line_start: int,
+        line_end: int,
+        language: str
+    ) -> Optional[CodeChunk]:
+        """Create chunk from a tree-sitter node's source span
+
+        Takes the raw byte span so the hash runs on it directly; the
+        str decode happens once, for the content field.
+        """
+        try:
+            content = content_bytes.decode()
+            return CodeChunk(
+                content=content,
+                file_path=file_path,
+                function_name=function_name,
+                class_name=class_name,
+                line_start=line_start,
+                line_end=line_end,
+                language=language,
+                complexity_score=self._calculate_js_complexity(content),
+                hash=_hash_bytes(content_bytes)
+            )
+        except Exception as e:
+            logger.warning("Failed to create JS chunk", error=str(e))
+            return None
+
+    # Single-pass tokenizer for the fallback chunker. Strings and
+    # comments are consumed without producing events, so braces inside
+    # them no longer corrupt the depth count; declarations and braces
+    # come back as (kind, name, offset) events. The old per-line loop
+    # ran two re.match calls plus two str.count scans per line.
+    _JS_SCANNER = re.Scanner([
+        (r"//[^\n]*", None),
+        (r"/\*.*?\*/", None),
+        (r'"(?:\\.|[^"\\\n])*"', None),
+        (r"'(?:\\.|[^'\\\n])*'", None),
+        (r"`(?:\\.|[^`\\])*`", None),
+        (
+            r"\b(?:export\s+)?(?:async\s+)?function\s+\w+",
+            lambda scanner, token: ("func", token.split()[-1], scanner.match.start())
+        ),
+        (
+            r"\b(?:export\s+)?class\s+\w+",
+            lambda scanner, token: ("class", token.split()[-1], scanner.match.start())
+        ),
+        (r"\{", lambda scanner, token: ("open", None, scanner.match.start())),
+        (r"\}", lambda scanner, token: ("close", None, scanner.match.start())),
+        (r"\w+", None),
+        (r"\s+", None),
+        (r".", None)
+    ], re.DOTALL)
+
+    def _chunk_js_code_regex(self, code_content: str, file_path: str, language: str) -> List[CodeChunk]:
+        """Tokenizer/brace-depth fallback JS/TS chunker
+
+        One Scanner pass yields declaration and brace events; a chunk
+        spans a top-level function or class declaration through its
+        balancing close brace. Line numbers come from bisecting event
+        offsets into the line index.
+        """
+        events, _ = self._JS_SCANNER.scan(code_content)
+        offsets = _line_offsets(code_content)
+        chunks: List[CodeChunk] = []
+        depth = 0
+        pending: Optional[Tuple[str, str, int]] = None  # declared, brace not yet seen
+        current: Optional[Tuple[str, str, int]] = None  # inside its body
+
+        def emit(kind: str, name: str, start: int, stop: int) -> None:
             chunk = self._create_js_chunk(
-                current_chunk, file_path, current_function,
-                current_class, start_line, len(lines), language
+                code_content[start:stop],
+                file_path,
+                function_name=name if kind == "func" else None,
+                class_name=name if kind == "class" else None,
+                start_line=bisect_right(offsets, start),
+                end_line=bisect_right(offsets, stop - 1),
+                language=language
             )
             if chunk:
                 chunks.append(chunk)
-        
+
+        for kind, name, pos in events:
+            if kind == "open":
+                depth += 1
+                if pending is not None and depth == 1:
+                    current = pending
+                pending = None
+            elif kind == "close":
+                depth = max(depth - 1, 0)
+                if current is not None and depth == 0:
+                    emit(current[0], current[1], current[2], pos + 1)
+                    current = None
+            elif depth == 0:
+                pending = (kind, name, pos)
+
+        # Unbalanced braces at EOF: close out the open chunk
+        if current is not None:
+            emit(current[0], current[1], current[2], len(code_content))
+
         return chunks
 
     def _create_js_chunk(
-        self, 
-        chunk_lines: List[str], 
-        file_path: str, 
+        self,
+        content: str,
+        file_path: str,
         function_name: Optional[str],
         class_name: Optional[str],
         start_line: int,
@@ -273,10 +779,9 @@ class CodeChunker:
     ) -> Optional[CodeChunk]:
         """Create chunk for JavaScript/TypeScript code"""
         try:
-            content = '\n'.join(chunk_lines)
             complexity = self._calculate_js_complexity(content)
-            content_hash = hashlib.sha256(content.encode()).hexdigest()
-            
+            content_hash = _hash_content(content)
+
             return CodeChunk(
                 content=content,
                 file_path=file_path,
@@ -288,78 +793,76 @@ class CodeChunker:
                 complexity_score=complexity,
                 hash=content_hash
             )
-            
+
         except Exception as e:
             logger.warning("Failed to create JS chunk", error=str(e))
             return None
 
-    def _chunk_generic_code(self, code_content: str, file_path: str, language: str) -> List[CodeChunk]:
+    def _iter_generic_chunks(self, code_content: str, file_path: str, language: str) -> Iterator[CodeChunk]:
         """Generic chunking for unsupported languages"""
-        lines = code_content.split('\n')
-        chunks = []
-        
+        # Line offsets instead of a materialized line list; each chunk
+        # is one substring copy of its span
+        offsets = _line_offsets(code_content)
+        num_lines = len(offsets)
+        code_bytes = _ascii_bytes(code_content)
+
         # Create chunks of reasonable size
         chunk_size = 50  # lines per chunk
         overlap = 10     # lines overlap
-        
-        for i in range(0, len(lines), chunk_size - overlap):
-            chunk_lines = lines[i:i + chunk_size]
-            content = '\n'.join(chunk_lines)
-            
+
+        for i in range(0, num_lines, chunk_size - overlap):
+            end = min(i + chunk_size, num_lines)
+            begin, stop = _line_span(code_content, offsets, i, end)
+            content = code_content[begin:stop]
+
             if content.strip():
                 complexity = self._calculate_generic_complexity(content)
-                content_hash = hashlib.sha256(content.encode()).hexdigest()
+                # Overlapping chunks hash zero-copy from the shared
+                # buffer when offsets align
+                if code_bytes is not None:
+                    content_hash = _hash_bytes(memoryview(code_bytes)[begin:stop])
+                else:
+                    content_hash = _hash_content(content)
                 
-                chunk = CodeChunk(
+                yield CodeChunk(
                     content=content,
                     file_path=file_path,
                     function_name=None,
                     class_name=None,
                     line_start=i + 1,
-                    line_end=min(i + chunk_size, len(lines)),
+                    line_end=end,
                     language=language,
                     complexity_score=complexity,
                     hash=content_hash
                 )
-                chunks.append(chunk)
-        
-        return chunks
 
     def _calculate_complexity(self, node: ast.AST) -> float:
         """Calculate cyclomatic complexity for AST node"""
         complexity = 1  # Base complexity
-        
+        weights = _COMPLEXITY_WEIGHTS
+
         for child in ast.walk(node):
-            if isinstance(child, (ast.If, ast.While, ast.For, ast.AsyncFor)):
-                complexity += 1
-            elif isinstance(child, ast.ExceptHandler):
-                complexity += 1
-            elif isinstance(child, ast.BoolOp):
+            child_type = type(child)
+            weight = weights.get(child_type)
+            if weight is not None:
+                complexity += weight
+            elif child_type is ast.BoolOp:
                 complexity += len(child.values) - 1
-        
+
         return min(complexity / 10.0, 1.0)  # Normalize to 0-1
 
     def _calculate_js_complexity(self, content: str) -> float:
         """Calculate complexity for JavaScript/TypeScript code"""
-        complexity = 1
-        
-        # Count control flow statements
-        complexity += content.count('if ') + content.count('while ') + content.count('for ')
-        complexity += content.count('switch ') + content.count('case ')
-        complexity += content.count('catch ') + content.count('finally ')
-        complexity += content.count('&&') + content.count('||')
-        
+        complexity = 1 + len(self._JS_COMPLEXITY_RE.findall(content))
         return min(complexity / 20.0, 1.0)  # Normalize to 0-1
 
     def _calculate_generic_complexity(self, content: str) -> float:
         """Calculate complexity for generic code"""
-        complexity = 1
-        
-        # Count common control flow patterns
-        complexity += content.count('if ') + content.count('while ') + content.count('for ')
-        complexity += content.count('switch ') + content.count('case ')
-        complexity += content.count('&&') + content.count('||')
-        
+        if _scan_branch_tokens is not None:
+            buf = np.frombuffer(content.encode(), dtype=np.uint8)
+            complexity = 1 + int(_scan_branch_tokens(buf))
+        else:
+            complexity = 1 + len(self._GENERIC_COMPLEXITY_RE.findall(content))
         return min(complexity / 15.0, 1.0)  # Normalize to 0-1
 
     def get_chunking_stats(self) -> Dict[str, Any]:
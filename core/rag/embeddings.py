@@ -1,26 +1,192 @@
 """
 Embedding generation for Code Review AI
 """
-import hashlib
-from typing import List, Dict, Any, Optional
+import asyncio
+import math
+import re
+from typing import List, Dict, Any, Optional, Tuple
+from collections import OrderedDict
 from dataclasses import dataclass
 
+import numpy as np
 import structlog
 import openai
+
+try:
+    # Optional: runtime-dispatched SIMD kernels (AVX-512/AVX2/NEON) for
+    # cosine distance; the numpy paths below are the fallback (install
+    # with the `speed` extra)
+    import simsimd
+except ImportError:
+    simsimd = None
+
+try:
+    # Optional: approximate nearest-neighbour graph index (install with
+    # the `speed` extra); without it every search stays a brute force
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+try:
+    # Optional: SIMD-parallel hash, typically several times faster than
+    # software SHA-256 on code-sized texts (install with the `speed`
+    # extra). Both digests are 64 hex chars, so cache keys and the
+    # code_hash column accept either — but a deployment should stick to
+    # one or cached entries keyed by the other go cold.
+    from blake3 import blake3 as _hash_factory
+except ImportError:
+    from hashlib import sha256 as _hash_factory
+
+
+def _text_hash(text: str) -> str:
+    """64-hex content fingerprint of a text"""
+    return _hash_factory(text.encode()).hexdigest()
+
 from core.config import get_settings
+from core.llm.cache import LLMCache
+from core.rag._simd_kernels import batch_cosine
 
 logger = structlog.get_logger(__name__)
 settings = get_settings()
 
+# Micro-batching bounds for the embedding coalescer: a batch closes as
+# soon as it holds this many texts or the oldest request has waited
+# this long. The wait is well under one OpenAI round-trip, so callers
+# trade ~5 ms for sharing a single request.
+_BATCH_MAX = 96
+_BATCH_WAIT_MS = 5
+
+# In-process exact-tier capacity; at 1536 float32 dims this is ~12 MB
+_MEMO_SIZE = 2048
+
+# Below this many candidates a brute-force scan beats building an HNSW
+# graph, even amortized over repeated queries
+_HNSW_MIN_CANDIDATES = 1024
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+class _ProxyIndex:
+    """In-memory cosine index over cheap token-hash fingerprints
+
+    Semantic tier of the embedding cache: texts that differ only in
+    whitespace, identifiers, or light edits land near the same
+    token-count vector, so a high-similarity neighbour's already-paid
+    embedding can be reused without an API call. The fingerprints are a
+    proxy — using real embeddings for the lookup would require the very
+    API call the tier exists to avoid. Fixed capacity, ring-overwritten.
+    """
+
+    DIM = 256
+    CAPACITY = 2048
+
+    def __init__(self):
+        self._vectors = np.zeros((self.CAPACITY, self.DIM), dtype=np.float32)
+        self._embeddings: List[Optional[np.ndarray]] = [None] * self.CAPACITY
+        self._size = 0
+        self._cursor = 0
+
+    @classmethod
+    def embed(cls, text: str) -> np.ndarray:
+        """Hash tokens into a normalized count vector"""
+        vector = np.zeros(cls.DIM, dtype=np.float32)
+        for token in _TOKEN_RE.findall(text.lower()):
+            vector[hash(token) % cls.DIM] += 1.0
+        norm = float(np.linalg.norm(vector))
+        if norm > 0.0:
+            vector /= norm
+        return vector
+
+    def search(self, vector: np.ndarray, threshold: float):
+        """Return the best match above threshold, or None"""
+        if self._size == 0:
+            return None
+        similarities = self._vectors[:self._size] @ vector
+        best = int(np.argmax(similarities))
+        if similarities[best] >= threshold:
+            return self._embeddings[best], float(similarities[best])
+        return None
+
+    def add(self, vector: np.ndarray, embedding: np.ndarray) -> None:
+        self._vectors[self._cursor] = vector
+        self._embeddings[self._cursor] = embedding
+        self._cursor = (self._cursor + 1) % self.CAPACITY
+        self._size = min(self._size + 1, self.CAPACITY)
+
+
+# Process-wide so every EmbeddingGenerator instance shares the same hits
+_PROXY_INDEX = _ProxyIndex()
+
+
+def quantize_embedding(vector: List[float]) -> Tuple[bytes, float]:
+    """Quantize a vector to int8 with a per-vector absmax scale
+
+    1536 bytes instead of 6 KB per vector; reconstruct with
+    dequantize_embedding, or compare directly with
+    calculate_int8_similarity since cosine ignores the scale.
+    """
+    values = np.asarray(vector, dtype=np.float32)
+    scale = float(np.max(np.abs(values))) / 127.0 if len(values) else 0.0
+    if scale == 0.0:
+        return np.zeros(len(values), dtype=np.int8).tobytes(), 0.0
+    return np.round(values / scale).astype(np.int8).tobytes(), scale
+
+
+def dequantize_embedding(data: bytes, scale: float) -> np.ndarray:
+    """Reconstruct the float32 vector from its int8 form"""
+    return np.frombuffer(data, dtype=np.int8).astype(np.float32) * scale
+
+
+def calculate_int8_similarity(data1: bytes, data2: bytes) -> float:
+    """Cosine similarity directly over int8-quantized vectors
+
+    The per-vector scales cancel out of cosine, so the raw bytes are
+    compared as-is. With simsimd installed this dispatches to integer
+    SIMD dot products (VNNI where the CPU has it); the numpy fallback
+    widens to float32 first.
+    """
+    vec1 = np.frombuffer(data1, dtype=np.int8)
+    vec2 = np.frombuffer(data2, dtype=np.int8)
+
+    if simsimd is not None:
+        distance = float(simsimd.cosine(vec1, vec2))
+        return 0.0 if math.isnan(distance) else 1.0 - distance
+
+    vec1 = vec1.astype(np.float32)
+    vec2 = vec2.astype(np.float32)
+    denom = float(np.vdot(vec1, vec1)) * float(np.vdot(vec2, vec2))
+    if denom == 0.0:
+        return 0.0
+    return float(np.dot(vec1, vec2)) / math.sqrt(denom)
+
 
 @dataclass
 class EmbeddingResult:
-    """Embedding result data structure"""
-    vector: List[float]
+    """Embedding result data structure
+
+    Accepts a plain ``List[float]`` at the boundary but stores the
+    vector as a contiguous float32 ndarray: ~6 KB instead of ~40 KB of
+    boxed Python floats at 1536 dims, and the similarity paths get to
+    skip their per-call conversion since the cosine workload is bound
+    by memory bandwidth anyway.
+
+    Vectors are L2-normalized on construction (pass is_normalized=True
+    for one that already is, e.g. off a cache hit): the magnitude never
+    changes between comparisons, so paying one division here makes
+    cosine against another normalized vector a plain dot product.
+    """
+    vector: np.ndarray
     model: str
     dimension: int
     text_hash: str
     metadata: Dict[str, Any]
+    is_normalized: bool = False
+
+    def __post_init__(self):
+        self.vector = np.asarray(self.vector, dtype=np.float32)
+        if not self.is_normalized:
+            self.vector = self.vector / (float(np.linalg.norm(self.vector)) or 1.0)
+            self.is_normalized = True
 
 
 class EmbeddingGenerator:
@@ -30,6 +196,19 @@ class EmbeddingGenerator:
         self.openai_client = openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
         self.model = settings.LLM_MODEL_EMBEDDINGS
         self.dimension = self._get_model_dimension()
+        # Coalescer state, created lazily on the first call so the
+        # queue and worker bind to the running event loop
+        self._batch_queue: Optional[asyncio.Queue] = None
+        self._batch_worker_task: Optional[asyncio.Task] = None
+        # Exact cache tier: in-process LRU in front of Redis, both
+        # keyed by the text's SHA-256. Embeddings are deterministic per
+        # model, so a hash hit is always safe to serve.
+        self.cache = LLMCache()
+        self._memo: OrderedDict[str, np.ndarray] = OrderedDict()
+        # ANN index over the last large candidate set, rebuilt only
+        # when the set changes (fingerprinted by its text hashes)
+        self._hnsw_index = None
+        self._hnsw_fingerprint: Optional[int] = None
 
     def _get_model_dimension(self) -> int:
         """Get embedding dimension for model"""
@@ -43,40 +222,154 @@ class EmbeddingGenerator:
     async def generate_embedding(
         self,
         text: str,
-        metadata: Optional[Dict[str, Any]] = None
+        metadata: Optional[Dict[str, Any]] = None,
+        text_hash: Optional[str] = None
     ) -> EmbeddingResult:
         """
         Generate embedding for text
+
+        Requests are coalesced: concurrent callers land in one batch
+        and share a single API round-trip instead of paying an
+        independent 100-300 ms latency each. Cached texts — exact by
+        content hash, or near-duplicates when the semantic tier is
+        enabled — skip the API entirely.
+
+        Callers that already hold the content's 64-hex digest (e.g. a
+        CodeChunk's hash, bound for code_hash) can pass it as text_hash
+        so the text is hashed exactly once.
         """
         try:
             logger.debug("Generating embedding", model=self.model, text_length=len(text))
-            
-            # Generate text hash for deduplication
-            text_hash = hashlib.sha256(text.encode()).hexdigest()
-            
-            # Call OpenAI API
-            response = await self.openai_client.embeddings.create(
-                model=self.model,
-                input=text
-            )
-            
-            embedding_vector = response.data[0].embedding
-            
-            result = EmbeddingResult(
-                vector=embedding_vector,
-                model=self.model,
-                dimension=self.dimension,
-                text_hash=text_hash,
-                metadata=metadata or {}
-            )
-            
-            logger.debug("Embedding generated", dimension=len(embedding_vector))
+
+            if text_hash is None:
+                text_hash = _text_hash(text)
+            vector = await self._cached_vector(text, text_hash)
+            if vector is not None:
+                return EmbeddingResult(
+                    vector=vector,
+                    model=self.model,
+                    dimension=self.dimension,
+                    text_hash=text_hash,
+                    metadata=metadata or {},
+                    is_normalized=True  # cached vectors were normalized on fill
+                )
+
+            future: asyncio.Future = asyncio.get_running_loop().create_future()
+            self._ensure_batch_worker()
+            await self._batch_queue.put((text, text_hash, metadata or {}, future))
+
+            result = await future
+            logger.debug("Embedding generated", dimension=len(result.vector))
             return result
-            
+
         except Exception as e:
             logger.error("Embedding generation failed", error=str(e))
             raise
 
+    async def _cached_vector(self, text: str, text_hash: str) -> Optional[np.ndarray]:
+        """Look up a vector in the cache tiers: memo, Redis, semantic"""
+        vector = self._memo.get(text_hash)
+        if vector is not None:
+            self._memo.move_to_end(text_hash)
+            return vector
+
+        cached = await self.cache.get(f"embedding:{self.model}:{text_hash}")
+        if cached is not None:
+            vector = np.asarray(cached, dtype=np.float32)
+            self._remember(text_hash, vector)
+            return vector
+
+        if settings.EMBEDDING_SEMANTIC_CACHE_ENABLED:
+            match = _PROXY_INDEX.search(
+                _PROXY_INDEX.embed(text),
+                settings.EMBEDDING_SEMANTIC_CACHE_THRESHOLD
+            )
+            if match is not None:
+                vector, similarity = match
+                logger.debug(
+                    "Embedding served from semantic tier",
+                    similarity=round(similarity, 4)
+                )
+                return vector
+
+        return None
+
+    def _remember(self, text_hash: str, vector: np.ndarray) -> None:
+        """Insert into the in-process LRU, evicting the oldest entry"""
+        self._memo[text_hash] = vector
+        self._memo.move_to_end(text_hash)
+        if len(self._memo) > _MEMO_SIZE:
+            self._memo.popitem(last=False)
+
+    async def _store_vector(self, text: str, text_hash: str, vector: np.ndarray) -> None:
+        """Fill every cache tier after a paid API call"""
+        self._remember(text_hash, vector)
+        await self.cache.set(
+            f"embedding:{self.model}:{text_hash}",
+            vector.tolist(),
+            fire_and_forget=True
+        )
+        if settings.EMBEDDING_SEMANTIC_CACHE_ENABLED:
+            _PROXY_INDEX.add(_PROXY_INDEX.embed(text), vector)
+
+    def _ensure_batch_worker(self) -> None:
+        """Start (or restart) the batching worker on the current loop"""
+        if self._batch_worker_task is None or self._batch_worker_task.done():
+            self._batch_queue = asyncio.Queue()
+            self._batch_worker_task = asyncio.create_task(self._batch_worker())
+
+    async def _batch_worker(self) -> None:
+        """Drain queued texts into batched embeddings.create calls
+
+        Blocks for the first request, then keeps collecting until the
+        batch is full or the wait window closes, issues one API call,
+        fans the vectors back through each caller's future, and fills
+        the cache tiers for the next caller.
+        """
+        queue = self._batch_queue
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch: List[Tuple[str, str, Dict[str, Any], asyncio.Future]] = [
+                await queue.get()
+            ]
+            deadline = loop.time() + _BATCH_WAIT_MS / 1000.0
+            while len(batch) < _BATCH_MAX:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(
+                        await asyncio.wait_for(queue.get(), timeout=timeout)
+                    )
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                response = await self.openai_client.embeddings.create(
+                    model=self.model,
+                    input=[text for text, _, _, _ in batch]
+                )
+            except Exception as e:
+                for _, _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (text, text_hash, metadata, future), embedding_data in zip(
+                batch, response.data
+            ):
+                result = EmbeddingResult(
+                    vector=embedding_data.embedding,
+                    model=self.model,
+                    dimension=self.dimension,
+                    text_hash=text_hash,
+                    metadata=metadata
+                )
+                await self._store_vector(text, text_hash, result.vector)
+                if not future.done():  # caller may have given up waiting
+                    future.set_result(result)
+
     async def generate_batch_embeddings(
         self,
         texts: List[str],
@@ -87,17 +380,26 @@ class EmbeddingGenerator:
         """
         try:
             logger.debug("Generating batch embeddings", count=len(texts))
-            
+
+            # Hash in a worker thread while the API call is in flight:
+            # the digest loop overlaps the network round-trip instead of
+            # adding a serial pass over every text afterwards
+            hash_task = asyncio.get_running_loop().run_in_executor(
+                None, lambda: [_text_hash(text) for text in texts]
+            )
+
             # Call OpenAI API for batch
             response = await self.openai_client.embeddings.create(
                 model=self.model,
                 input=texts
             )
-            
+
+            text_hashes = await hash_task
+
             results = []
             for i, embedding_data in enumerate(response.data):
                 text = texts[i]
-                text_hash = hashlib.sha256(text.encode()).hexdigest()
+                text_hash = text_hashes[i]
                 metadata = metadata_list[i] if metadata_list and i < len(metadata_list) else {}
                 
                 result = EmbeddingResult(
@@ -107,8 +409,9 @@ class EmbeddingGenerator:
                     text_hash=text_hash,
                     metadata=metadata
                 )
+                await self._store_vector(text, text_hash, result.vector)
                 results.append(result)
-            
+
             logger.debug("Batch embeddings generated", count=len(results))
             return results
             
@@ -119,25 +422,42 @@ class EmbeddingGenerator:
     def calculate_similarity(self, embedding1: List[float], embedding2: List[float]) -> float:
         """
         Calculate cosine similarity between two embeddings
+
+        Accepts raw vectors or EmbeddingResults; when both sides are
+        known to be unit-length the norms cancel and cosine is just the
+        dot product — two norms and a division fewer per pair.
         """
         try:
-            import numpy as np
-            
-            # Convert to numpy arrays
-            vec1 = np.array(embedding1)
-            vec2 = np.array(embedding2)
-            
-            # Calculate cosine similarity
-            dot_product = np.dot(vec1, vec2)
-            norm1 = np.linalg.norm(vec1)
-            norm2 = np.linalg.norm(vec2)
-            
-            if norm1 == 0 or norm2 == 0:
+            normalized1 = getattr(embedding1, "is_normalized", False)
+            normalized2 = getattr(embedding2, "is_normalized", False)
+            if normalized1:
+                embedding1 = embedding1.vector
+            if normalized2:
+                embedding2 = embedding2.vector
+
+            # asarray skips the copy when the input is already a
+            # float32 ndarray
+            vec1 = np.asarray(embedding1, dtype=np.float32)
+            vec2 = np.asarray(embedding2, dtype=np.float32)
+
+            if normalized1 and normalized2:
+                return float(np.dot(vec1, vec2))
+
+            if simsimd is not None:
+                # simsimd returns cosine *distance* from a hand-tuned
+                # SIMD kernel; NaN marks a zero-norm input
+                distance = float(simsimd.cosine(vec1, vec2))
+                return 0.0 if math.isnan(distance) else 1.0 - distance
+
+            # Three raw dot products and one scalar sqrt instead of two
+            # np.linalg.norm calls, which pay norm-type dispatch and
+            # their own square roots per call
+            denom = float(np.vdot(vec1, vec1)) * float(np.vdot(vec2, vec2))
+            if denom == 0.0:
                 return 0.0
-            
-            similarity = dot_product / (norm1 * norm2)
-            return float(similarity)
-            
+
+            return float(np.dot(vec1, vec2)) / math.sqrt(denom)
+
         except Exception as e:
             logger.error("Similarity calculation failed", error=str(e))
             return 0.0
@@ -153,28 +473,123 @@ class EmbeddingGenerator:
         Find similar embeddings based on cosine similarity
         """
         try:
-            similarities = []
-            
-            for candidate in candidate_embeddings:
-                similarity = self.calculate_similarity(query_embedding, candidate.vector)
-                
-                if similarity >= threshold:
-                    similarities.append({
-                        "embedding": candidate,
-                        "similarity": similarity,
-                        "metadata": candidate.metadata
-                    })
-            
-            # Sort by similarity (descending)
-            similarities.sort(key=lambda x: x["similarity"], reverse=True)
-            
-            # Return top-k results
-            return similarities[:top_k]
-            
+            if not candidate_embeddings:
+                return []
+
+            # Stack every candidate once and score all pairs with one
+            # BLAS matvec. The per-candidate calculate_similarity loop
+            # paid Python dispatch per pair and recomputed the query
+            # norm N times.
+            matrix = np.asarray(
+                [candidate.vector for candidate in candidate_embeddings],
+                dtype=np.float32
+            )
+            query = np.asarray(query_embedding, dtype=np.float32)
+
+            if (
+                hnswlib is not None
+                and len(candidate_embeddings) >= _HNSW_MIN_CANDIDATES
+                and float(np.linalg.norm(query)) > 0.0
+            ):
+                return self._find_similar_hnsw(
+                    query, matrix, candidate_embeddings, threshold, top_k
+                )
+
+            if simsimd is not None:
+                # One SIMD cdist call over the whole candidate matrix;
+                # NaN distances (zero-norm inputs) score 0.0
+                distances = np.asarray(
+                    simsimd.cdist(query.reshape(1, -1), matrix, metric="cosine")
+                )[0]
+                sims = 1.0 - np.nan_to_num(distances, nan=1.0)
+            elif batch_cosine is not None:
+                # Fused dot+norm loop compiled per-row across cores;
+                # beats the GEMV path on per-call numpy dispatch for
+                # these short (1536-dim) vectors
+                sims = batch_cosine(np.ascontiguousarray(query), matrix)
+            else:
+                query_norm = float(np.linalg.norm(query))
+                if query_norm == 0.0:
+                    sims = np.zeros(len(candidate_embeddings), dtype=np.float32)
+                elif all(c.is_normalized for c in candidate_embeddings):
+                    # Unit-length rows: the GEMV alone is the cosine,
+                    # no per-row norms to compute
+                    sims = (matrix @ query) / query_norm
+                else:
+                    norms = np.linalg.norm(matrix, axis=1)
+                    norms[norms == 0.0] = 1.0  # zero vectors score 0.0, not NaN
+                    sims = (matrix @ query) / (norms * query_norm)
+
+            # Threshold with one boolean mask, then select the top_k
+            # survivors in O(n) with argpartition before sorting only
+            # those k — a full argsort pays O(n log n) to order results
+            # that get sliced away
+            keep = np.flatnonzero(sims >= threshold)
+            if len(keep) > top_k:
+                keep = keep[np.argpartition(-sims[keep], top_k - 1)[:top_k]]
+            order = keep[np.argsort(-sims[keep])]
+
+            return [
+                {
+                    "embedding": candidate_embeddings[i],
+                    "similarity": float(sims[i]),
+                    "metadata": candidate_embeddings[i].metadata
+                }
+                for i in order
+            ]
+
         except Exception as e:
             logger.error("Similar embedding search failed", error=str(e))
             return []
 
+    def _find_similar_hnsw(
+        self,
+        query: np.ndarray,
+        matrix: np.ndarray,
+        candidate_embeddings: List[EmbeddingResult],
+        threshold: float,
+        top_k: int
+    ) -> List[Dict[str, Any]]:
+        """Approximate top-k search through an HNSW graph
+
+        Each query walks the graph in roughly O(log N) instead of
+        scanning all N candidates, at >95% recall for these settings.
+        The graph is built once per candidate set — fingerprinted by
+        its text hashes — and reused until the set changes, so the
+        O(N log N) construction amortizes across repeated queries.
+        """
+        fingerprint = hash(tuple(c.text_hash for c in candidate_embeddings))
+        if self._hnsw_fingerprint != fingerprint:
+            index = hnswlib.Index(space="cosine", dim=matrix.shape[1])
+            index.init_index(
+                max_elements=matrix.shape[0], M=16, ef_construction=200
+            )
+            index.add_items(matrix, np.arange(matrix.shape[0]))
+            self._hnsw_index = index
+            self._hnsw_fingerprint = fingerprint
+
+        # ef bounds the candidate pool walked per query; keep it
+        # comfortably above k so recall doesn't degrade for large top_k
+        self._hnsw_index.set_ef(max(64, top_k * 4))
+        labels, distances = self._hnsw_index.knn_query(
+            query.reshape(1, -1), k=min(top_k, matrix.shape[0])
+        )
+
+        # knn_query returns ascending distance, so results are already
+        # ordered by descending similarity
+        results = []
+        for label, distance in zip(labels[0], distances[0]):
+            similarity = 1.0 - float(distance)
+            if similarity < threshold:
+                continue
+            candidate = candidate_embeddings[int(label)]
+            results.append({
+                "embedding": candidate,
+                "similarity": similarity,
+                "metadata": candidate.metadata
+            })
+        return results
+
     def get_embedding_stats(self) -> Dict[str, Any]:
         """Get embedding generation statistics"""
         return {
@@ -5,9 +5,14 @@ import time
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
 
+import numpy as np
 import structlog
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
 from core.rag.embeddings import EmbeddingGenerator
 from core.rag.chunking import CodeChunker
+from db.models import CodeEmbedding, Vector
 from observability.metrics import record_retrieval_metrics
 
 logger = structlog.get_logger(__name__)
@@ -40,10 +45,15 @@ class ContextRetriever:
         file_paths: List[str],
         repository_id: str,
         max_documents: int = 10,
-        similarity_threshold: float = 0.7
+        similarity_threshold: float = 0.7,
+        session: Optional[AsyncSession] = None
     ) -> List[RetrievedDocument]:
         """
         Retrieve relevant context documents for code analysis
+
+        With a database session and pgvector installed, retrieval runs
+        server-side against the HNSW index; otherwise it falls back to
+        the in-process scan.
         """
         start_time = time.time()
         
@@ -67,7 +77,8 @@ class ContextRetriever:
                 repository_id=repository_id,
                 file_paths=file_paths,
                 max_documents=max_documents,
-                similarity_threshold=similarity_threshold
+                similarity_threshold=similarity_threshold,
+                session=session
             )
 
             processing_time = time.time() - start_time
@@ -97,42 +108,99 @@ class ContextRetriever:
         repository_id: str,
         file_paths: List[str],
         max_documents: int,
-        similarity_threshold: float
+        similarity_threshold: float,
+        session: Optional[AsyncSession] = None
     ) -> List[RetrievedDocument]:
         """Retrieve documents from vector database"""
         try:
-            # This would integrate with Weaviate or similar vector database
-            # For now, return mock data
-            documents = []
-            
-            # Mock retrieval logic
+            if session is not None and Vector is not None:
+                return await self._retrieve_documents_pgvector(
+                    session=session,
+                    query_embedding=query_embedding,
+                    repository_id=repository_id,
+                    max_documents=max_documents,
+                    similarity_threshold=similarity_threshold
+                )
+
+            # Without a session (or pgvector) fall back to mock data
             mock_documents = self._get_mock_documents(repository_id, file_paths)
-            
-            for doc_data in mock_documents:
-                # Calculate similarity (mock)
-                similarity = self._calculate_mock_similarity(query_embedding, doc_data)
-                
-                if similarity >= similarity_threshold:
-                    document = RetrievedDocument(
-                        content=doc_data["content"],
-                        file_path=doc_data["file_path"],
-                        function_name=doc_data.get("function_name"),
-                        class_name=doc_data.get("class_name"),
-                        line_start=doc_data.get("line_start"),
-                        line_end=doc_data.get("line_end"),
-                        similarity_score=similarity,
-                        metadata=doc_data.get("metadata", {})
-                    )
-                    documents.append(document)
-            
-            # Sort by similarity and limit results
-            documents.sort(key=lambda x: x.similarity_score, reverse=True)
-            return documents[:max_documents]
-            
+            if not mock_documents:
+                return []
+
+            # Score every candidate at once, threshold with one mask,
+            # and pick the top max_documents with an O(n) argpartition
+            # before sorting only those — building and fully sorting
+            # RetrievedDocuments that get sliced away is wasted work
+            scores = self._score_mock_documents(query_embedding, mock_documents)
+            keep = np.flatnonzero(scores >= similarity_threshold)
+            if len(keep) > max_documents:
+                keep = keep[
+                    np.argpartition(-scores[keep], max_documents - 1)[:max_documents]
+                ]
+            order = keep[np.argsort(-scores[keep])]
+
+            documents = []
+            for i in order:
+                doc_data = mock_documents[i]
+                documents.append(RetrievedDocument(
+                    content=doc_data["content"],
+                    file_path=doc_data["file_path"],
+                    function_name=doc_data.get("function_name"),
+                    class_name=doc_data.get("class_name"),
+                    line_start=doc_data.get("line_start"),
+                    line_end=doc_data.get("line_end"),
+                    similarity_score=float(scores[i]),
+                    metadata=doc_data.get("metadata", {})
+                ))
+            return documents
+
         except Exception as e:
             logger.error("Document retrieval failed", error=str(e))
             return []
 
+    async def _retrieve_documents_pgvector(
+        self,
+        session: AsyncSession,
+        query_embedding: List[float],
+        repository_id: str,
+        max_documents: int,
+        similarity_threshold: float
+    ) -> List[RetrievedDocument]:
+        """Retrieve documents through the pgvector HNSW index
+
+        Postgres walks the index and returns the max_documents nearest
+        rows by cosine distance; only those ever cross the wire.
+        """
+        query_vector = np.asarray(query_embedding, dtype=np.float32)
+        distance = CodeEmbedding.embedding_vector.cosine_distance(query_vector)
+
+        result = await session.execute(
+            select(CodeEmbedding, distance.label("distance"))
+            .where(CodeEmbedding.repository_id == repository_id)
+            .order_by(distance)
+            .limit(max_documents)
+        )
+
+        documents = []
+        for row, dist in result.all():
+            similarity = 1.0 - float(dist)
+            if similarity < similarity_threshold:
+                continue
+            documents.append(RetrievedDocument(
+                content=row.code_content,
+                file_path=row.file_path,
+                function_name=row.function_name,
+                class_name=row.class_name,
+                line_start=row.line_start,
+                line_end=row.line_end,
+                similarity_score=similarity,
+                metadata={
+                    "language": row.language,
+                    "complexity": row.complexity_score
+                }
+            ))
+        return documents
+
     def _get_mock_documents(self, repository_id: str, file_paths: List[str]) -> List[Dict[str, Any]]:
         """Get mock documents for testing"""
         return [
@@ -156,21 +224,42 @@ class ContextRetriever:
             }
         ]
 
-    def _calculate_mock_similarity(self, query_embedding: List[float], doc_data: Dict[str, Any]) -> float:
-        """Calculate mock similarity score"""
-        # Simple mock similarity based on content length and keywords
-        content = doc_data["content"]
-        base_similarity = 0.5
-        
-        # Boost similarity for matching file paths
-        if any(keyword in content.lower() for keyword in ["def", "class", "function"]):
-            base_similarity += 0.2
-        
+    _SIMILARITY_KEYWORDS = ("def", "class", "function")
+
+    def _score_mock_documents(
+        self,
+        query_embedding: List[float],
+        documents: List[Dict[str, Any]]
+    ) -> np.ndarray:
+        """Calculate mock similarity scores for all candidates at once
+
+        Vectorized replacement for the per-document scoring loop: the
+        keyword and length boosts become two boolean masks applied to
+        one scores array.
+        """
+        contents = [doc["content"] for doc in documents]
+        scores = np.full(len(contents), 0.5, dtype=np.float32)
+
+        # Boost similarity for code-like content
+        keyword_hits = np.fromiter(
+            (
+                any(keyword in content.lower() for keyword in self._SIMILARITY_KEYWORDS)
+                for content in contents
+            ),
+            dtype=bool,
+            count=len(contents)
+        )
+        scores[keyword_hits] += 0.2
+
         # Boost for longer, more detailed content
-        if len(content) > 100:
-            base_similarity += 0.1
-        
-        return min(base_similarity, 1.0)
+        lengths = np.fromiter(
+            (len(content) for content in contents),
+            dtype=np.int64,
+            count=len(contents)
+        )
+        scores[lengths > 100] += 0.1
+
+        return np.minimum(scores, 1.0)
 
     async def retrieve_similar_functions(
         self,
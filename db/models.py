@@ -6,14 +6,26 @@ from datetime import datetime
 from typing import List, Optional, Dict, Any
 from uuid import UUID
 
-from sqlalchemy import Column, String, Text, DateTime, Boolean, Float, Integer, JSON, ForeignKey
+from sqlalchemy import Column, String, Text, DateTime, Boolean, Float, Integer, Index, JSON, LargeBinary, ForeignKey
 from sqlalchemy.dialects.postgresql import UUID as PostgresUUID
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
+try:
+    # Optional: native Postgres vector column (pgvector extension).
+    # Without it the JSON representation keeps the model usable, but
+    # every read parses a 1536-element array into Python floats and
+    # similarity search stays a client-side brute force.
+    from pgvector.sqlalchemy import Vector
+except ImportError:
+    Vector = None
+
 Base = declarative_base()
 
+# Dimension of the text-embedding-3-small / ada-002 vectors we store
+EMBEDDING_DIMENSION = 1536
+
 
 class User(Base):
     """User model"""
@@ -130,10 +142,32 @@ class CodeEmbedding(Base):
     
     # Code content
     code_content = Column(Text, nullable=False)
-    code_hash = Column(String(64), nullable=False, index=True)  # SHA-256 hash of code content
+    code_hash = Column(String(64), nullable=False, index=True)  # 64-hex content fingerprint
     
     # Embedding data
-    embedding_vector = Column(JSON, nullable=False)  # Vector embedding as JSON array
+    if Vector is not None:
+        # Contiguous float4 storage plus a server-side HNSW index:
+        # retrieval becomes an O(log N) index walk in Postgres instead
+        # of shipping JSON arrays to Python for an O(N) scan
+        embedding_vector = Column(Vector(EMBEDDING_DIMENSION), nullable=False)
+        __table_args__ = (
+            Index(
+                "ix_code_emb_vec",
+                "embedding_vector",
+                postgresql_using="hnsw",
+                postgresql_with={"m": 16, "ef_construction": 64},
+                postgresql_ops={"embedding_vector": "vector_cosine_ops"}
+            ),
+        )
+    else:
+        embedding_vector = Column(JSON, nullable=False)  # Vector embedding as JSON array
+
+    # int8-quantized copy (per-vector absmax scale): 1536 bytes instead
+    # of 6 KB per row. Cosine is scale-invariant, so similarity over
+    # the quantized bytes needs no dequantization; the float column
+    # above stays populated for recall comparison during rollout.
+    embedding_int8 = Column(LargeBinary, nullable=True)
+    embedding_scale = Column(Float, nullable=True)
     embedding_model = Column(String(100), nullable=False)  # Model used for embedding
     embedding_dimension = Column(Integer, nullable=False)  # Dimension of embedding vector
     
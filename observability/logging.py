@@ -13,11 +13,13 @@ settings = get_settings()
 
 def setup_logging():
     """Configure structured logging"""
-    
-    # Configure structlog
+    log_level = getattr(logging, settings.LOG_LEVEL.upper())
+
+    # Configure structlog. The filtering bound logger turns calls below the
+    # configured level into no-ops before the processor chain runs, so
+    # debug/info calls on hot paths cost a single level comparison.
     structlog.configure(
         processors=[
-            structlog.stdlib.filter_by_level,
             structlog.stdlib.add_logger_name,
             structlog.stdlib.add_log_level,
             structlog.stdlib.PositionalArgumentsFormatter(),
@@ -29,7 +31,7 @@ def setup_logging():
         ],
         context_class=dict,
         logger_factory=structlog.stdlib.LoggerFactory(),
-        wrapper_class=structlog.stdlib.BoundLogger,
+        wrapper_class=structlog.make_filtering_bound_logger(log_level),
         cache_logger_on_first_use=True,
     )
 
@@ -37,7 +39,7 @@ def setup_logging():
     logging.basicConfig(
         format="%(message)s",
         stream=sys.stdout,
-        level=getattr(logging, settings.LOG_LEVEL.upper()),
+        level=log_level,
     )
 
     # Set specific logger levels
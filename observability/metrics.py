@@ -3,7 +3,7 @@ Metrics collection for Code Review AI
 """
 import time
 from typing import Dict, Any, Optional
-from functools import wraps
+from functools import lru_cache, wraps
 
 from prometheus_client import Counter, Histogram, Gauge, Summary, CollectorRegistry, generate_latest
 from core.config import get_settings
@@ -273,8 +273,9 @@ def get_metrics_dict() -> Dict[str, Any]:
     }
 
 
+@lru_cache(maxsize=1)
 def setup_metrics():
-    """Setup metrics collection"""
+    """Setup metrics collection (idempotent; safe to call from multiple entrypoints)"""
     # Initialize default values
     cost_alert_threshold.set(settings.ALERT_THRESHOLD_USD)
     monthly_cost.set(0.0)
@@ -3,7 +3,7 @@ Distributed tracing for Code Review AI
 """
 import time
 from typing import Dict, Any, Optional
-from functools import wraps
+from functools import lru_cache, wraps
 
 import structlog
 from core.config import get_settings
@@ -279,8 +279,9 @@ def trace_cache_operation(operation: str):
     return decorator
 
 
+@lru_cache(maxsize=1)
 def setup_tracing():
-    """Setup distributed tracing"""
+    """Setup distributed tracing (idempotent; safe to call from multiple entrypoints)"""
     logger.info("Distributed tracing initialized")
     
     # Initialize any external tracing systems (Jaeger, Zipkin, etc.)
@@ -40,7 +40,7 @@ class TestLLMClient:
     @pytest.mark.asyncio
     async def test_analyze_code_success(self, llm_client, mock_anthropic_response):
         """Test successful code analysis"""
-        with patch.object(llm_client.anthropic_client.messages, 'create', return_value=mock_anthropic_response):
+        with patch.object(llm_client.anthropic_client.messages, 'create', new=AsyncMock(return_value=mock_anthropic_response)):
             with patch.object(llm_client.cache, 'get', return_value=None):
                 with patch.object(llm_client.cache, 'set', return_value=True):
                     result = await llm_client.analyze_code(
@@ -71,7 +71,7 @@ class TestLLMClient:
     @pytest.mark.asyncio
     async def test_call_anthropic(self, llm_client, mock_anthropic_response):
         """Test Anthropic API call"""
-        with patch.object(llm_client.anthropic_client.messages, 'create', return_value=mock_anthropic_response):
+        with patch.object(llm_client.anthropic_client.messages, 'create', new=AsyncMock(return_value=mock_anthropic_response)):
             response = await llm_client._call_anthropic("Test prompt")
             
             assert isinstance(response, LLMResponse)
@@ -82,7 +82,7 @@ class TestLLMClient:
     @pytest.mark.asyncio
     async def test_call_openai(self, llm_client, mock_openai_response):
         """Test OpenAI API call"""
-        with patch.object(llm_client.openai_client.chat.completions, 'create', return_value=mock_openai_response):
+        with patch.object(llm_client.openai_client.chat.completions, 'create', new=AsyncMock(return_value=mock_openai_response)):
             response = await llm_client._call_openai("Test prompt")
             
             assert isinstance(response, LLMResponse)
@@ -132,6 +132,23 @@ class TestLLMClient:
         assert len(result) == 1
         assert "null pointer" in result[0]["title"].lower()
 
+    def test_parse_text_response_field_formats(self, llm_client):
+        """Both plain and bold field markers must parse identically"""
+        plain = """Issue: Potential null pointer access
+Severity: high
+Description: This could cause a runtime error"""
+        bold = """**Issue:** Potential null pointer access
+**Severity:** high
+**Description:** This could cause a runtime error"""
+
+        for response in (plain, bold):
+            result = llm_client._parse_analysis_response(response)
+
+            assert len(result) == 1
+            assert result[0]["title"] == "Potential null pointer access"
+            assert result[0]["severity"] == "high"
+            assert result[0]["description"] == "This could cause a runtime error"
+
     def test_add_confidence_scores(self, llm_client):
         """Test confidence score addition"""
         suggestions = [
@@ -63,6 +63,24 @@ index 1111111..2222222 100644
         matches = pattern_matcher.analyze_code(clean_diff, ["src/clean.py"])
         assert len(matches) == 0
 
+    def test_multiline_rules_do_not_mask_other_findings(self, pattern_matcher):
+        """Greedy multi-line rules must not hide matches inside their span"""
+        diff = (
+            "+import os\n"
+            + "".join(f"+value_{i} = compute()\n" for i in range(12))
+            + '+password == "admin123"\n'
+            + "+timeout = 1000\n"
+        )
+
+        matches = pattern_matcher.analyze_code(diff, ["src/config.py"])
+        found = {match.rule_name for match in matches}
+
+        # unused_import matches from the import to near end-of-buffer;
+        # the rules matching inside that span must still be reported
+        assert "unused_import" in found
+        assert "hardcoded_password" in found
+        assert "magic_number" in found
+
     def test_add_custom_rule_success(self, pattern_matcher):
         """Test adding custom rule successfully"""
         result = pattern_matcher.add_custom_rule(
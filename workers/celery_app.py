@@ -1,11 +1,13 @@
 """
 Celery application configuration for Code Review AI
 """
+import asyncio
 import os
 from celery import Celery
 from celery.signals import worker_ready, worker_shutdown
 
 from core.config import get_settings
+from core.llm.client import shutdown_http_client
 
 settings = get_settings()
 
@@ -76,6 +78,15 @@ def worker_ready_handler(sender=None, **kwargs):
 def worker_shutdown_handler(sender=None, **kwargs):
     """Handle worker shutdown signal"""
     print("👋 Code Review AI worker is shutting down...")
+    # Release the shared HTTP client's pooled connections. Its transports
+    # are bound to the worker's persistent loop, so close them there —
+    # aclose() on a fresh asyncio.run loop raises and leaks the pool.
+    # Imported lazily: the tasks module imports celery_app at load time.
+    from workers.tasks import analyze_code
+    if analyze_code._event_loop is not None and not analyze_code._event_loop.is_closed():
+        analyze_code._run_async(shutdown_http_client())
+    else:
+        asyncio.run(shutdown_http_client())
 
 
 if __name__ == "__main__":
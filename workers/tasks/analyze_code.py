@@ -1,10 +1,22 @@
 """
 Code analysis tasks for Celery workers
 """
+import asyncio
+import json
 import time
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from uuid import UUID
 
+try:
+    # uvicorn[standard] ships uvloop for the API process; workers adopt
+    # the same C event loop so LLM awaits don't run on the slower
+    # pure-Python selector loop
+    import uvloop
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+except ImportError:
+    pass
+
+import redis
 import structlog
 from celery import current_task
 from sqlalchemy import select, update
@@ -27,6 +39,30 @@ settings = get_settings()
 engine = create_async_engine(settings.DATABASE_URL)
 AsyncSessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+# Sync Redis client for publishing review updates to websocket streamers
+redis_client = redis.Redis.from_url(settings.REDIS_URL)
+
+# One event loop per worker process, reused across tasks so loop-bound
+# resources (the shared httpx transport, Redis pools) stay warm
+_event_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _run_async(coro):
+    """Run a coroutine to completion on the worker's persistent loop"""
+    global _event_loop
+    if _event_loop is None or _event_loop.is_closed():
+        _event_loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_event_loop)
+    return _event_loop.run_until_complete(coro)
+
+
+def publish_review_update(review_id: str, payload: Dict[str, Any]) -> None:
+    """Publish a review status update for websocket subscribers"""
+    try:
+        redis_client.publish(f"review:{review_id}", json.dumps(payload, default=str))
+    except Exception as e:
+        logger.warning("Review update publish failed", review_id=review_id, error=str(e))
+
 
 @celery_app.task(bind=True, name="workers.tasks.analyze_code.analyze_code_task")
 def analyze_code_task(
@@ -42,7 +78,11 @@ def analyze_code_task(
     """
     start_time = time.time()
     review_uuid = UUID(review_id)
-    
+
+    def report_progress(message: str) -> None:
+        self.update_state(state="PROGRESS", meta={"status": message})
+        publish_review_update(review_id, {"status": "processing", "message": message})
+
     try:
         logger.info(
             "Starting code analysis task",
@@ -52,7 +92,7 @@ def analyze_code_task(
         )
 
         # Update task status
-        self.update_state(state="PROGRESS", meta={"status": "Initializing analysis"})
+        report_progress("Initializing analysis")
 
         # Initialize components
         llm_client = LLMClient()
@@ -64,17 +104,17 @@ def analyze_code_task(
         repository = get_or_create_repository(repository_url)
 
         # Update progress
-        self.update_state(state="PROGRESS", meta={"status": "Retrieving context"})
+        report_progress("Retrieving context")
 
         # Retrieve relevant context
-        context_docs = context_retriever.retrieve_context(
+        context_docs = _run_async(context_retriever.retrieve_context(
             diff_content=diff_content,
             file_paths=file_paths,
             repository_id=repository.id
-        )
+        ))
 
         # Update progress
-        self.update_state(state="PROGRESS", meta={"status": "Running pattern matching"})
+        report_progress("Running pattern matching")
 
         # Run pattern-based analysis
         pattern_suggestions = pattern_matcher.analyze_code(
@@ -83,15 +123,15 @@ def analyze_code_task(
         )
 
         # Update progress
-        self.update_state(state="PROGRESS", meta={"status": "Generating LLM analysis"})
+        report_progress("Generating LLM analysis")
 
         # Generate LLM-based analysis
-        llm_suggestions = llm_client.analyze_code(
+        llm_suggestions = _run_async(llm_client.analyze_code(
             diff_content=diff_content,
             context_docs=context_docs,
             file_paths=file_paths,
             repository_url=repository_url
-        )
+        ))
 
         # Combine and rank suggestions
         all_suggestions = pattern_suggestions + llm_suggestions
@@ -103,7 +143,7 @@ def analyze_code_task(
         confidence_scores = [s.get("confidence", 0.5) for s in ranked_suggestions]
 
         # Update progress
-        self.update_state(state="PROGRESS", meta={"status": "Saving results"})
+        report_progress("Saving results")
 
         # Save results to database
         save_analysis_results(
@@ -132,6 +172,14 @@ def analyze_code_task(
             cost_estimate=cost_estimate
         )
 
+        publish_review_update(review_id, {
+            "status": "completed",
+            "suggestions": ranked_suggestions,
+            "confidence_scores": confidence_scores,
+            "processing_time": processing_time,
+            "cost_estimate": cost_estimate
+        })
+
         return {
             "status": "completed",
             "suggestions": ranked_suggestions,
@@ -151,6 +199,7 @@ def analyze_code_task(
 
         # Update review status to failed
         update_review_status(review_uuid, "failed", error=str(e))
+        publish_review_update(review_id, {"status": "failed", "error": str(e)})
 
         return {
             "status": "failed",
@@ -11,7 +11,7 @@ from sqlalchemy import select, delete
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 
 from workers.celery_app import celery_app
-from core.rag.embeddings import EmbeddingGenerator
+from core.rag.embeddings import EmbeddingGenerator, quantize_embedding
 from core.rag.chunking import CodeChunker
 from db.models import CodeEmbedding, Repository
 from observability.metrics import record_embedding_metrics
@@ -78,9 +78,12 @@ def generate_repository_embeddings(
                 chunks = code_chunker.chunk_code(code_content, file_path)
                 
                 for chunk in chunks:
-                    # Generate embedding
+                    # Generate embedding, reusing the chunker's digest
+                    # so the text is hashed once for both the embedding
+                    # cache key and code_hash below
                     embedding = embedding_generator.generate_embedding(
                         text=chunk["content"],
+                        text_hash=chunk["hash"],
                         metadata={
                             "file_path": file_path,
                             "function_name": chunk.get("function_name"),
@@ -208,9 +211,12 @@ def update_file_embeddings(
         
         total_embeddings = 0
         for chunk in chunks:
-            # Generate embedding
+            # Generate embedding, reusing the chunker's digest so the
+            # text is hashed once for both the embedding cache key and
+            # code_hash below
             embedding = embedding_generator.generate_embedding(
                 text=chunk["content"],
+                text_hash=chunk["hash"],
                 metadata={
                     "file_path": file_path,
                     "function_name": chunk.get("function_name"),
@@ -340,12 +346,17 @@ def save_embedding(
     complexity_score: Optional[float]
 ) -> None:
     """Save embedding to database"""
+    # int8 copy stored alongside the float vector during rollout
+    embedding_int8, embedding_scale = quantize_embedding(embedding_vector)
+
     # This would be implemented with proper async database operations
     logger.info(
         "Saving embedding",
         repository_id=repository_id,
         file_path=file_path,
-        function_name=function_name
+        function_name=function_name,
+        quantized_bytes=len(embedding_int8),
+        quantization_scale=embedding_scale
     )
 
 